@@ -18,11 +18,12 @@ from discord.ext.commands.context import Context as CTX
 import subprocess
 from os import listdir, replace
 from os.path import getmtime, isfile
-from asyncio import gather, sleep
+from asyncio import gather, sleep, run_coroutine_threadsafe
 
 from Modules.reactech import Reactech
 from Modules.discord_utils import DscConverter, find_vc
-from Modules.data import data, path_from_root
+from Modules.data import data, adata, path_from_root
+from Modules.guild import guild_settings
 from Modules.basic import mixmatch, plural, correspond, yes_no
 
 
@@ -185,8 +186,8 @@ class Voice(CMDS.Cog):
             guild = channel.guild
         else: guild = ctx.guild
         
-        volume = data("Data/servers.json", 100, str(guild.id), "bots", str(self.bot.user.id), "volume",
-            filenotfound = None, keynotfound = None)
+        settings = await guild_settings(self.bot, guild.id)
+        volume = settings.volume
         if txt is None: return await ctx.reply(
             "Volume is currently at " + str(volume) + "%",
             mention_author = False)
@@ -218,7 +219,7 @@ class Voice(CMDS.Cog):
             msg = " (maximum volume)"
             volume = MAX_VOLUME
 
-        data("Data/servers.json", volume, str(guild.id), "bots", str(self.bot.user.id), "volume", read_only = False)
+        settings.volume = volume ; await settings.save()
         if guild.voice_client:
             vc = guild.voice_client
             if vc and vc.is_connected() and vc.source:
@@ -354,7 +355,7 @@ class Sounds(CMDS.Cog):
 
         name = format_filename(msg)[0]
         try:
-            audio = data("Data/audio.json", {}, filenotfound = None)
+            audio = await adata("Data/audio.json", {}, filenotfound = None)
             for key, value in audio.items():
                 if name == key or name in value.get("aliases", []):
                     name = key
@@ -373,12 +374,11 @@ class Sounds(CMDS.Cog):
         
         file = final + "." + exts[files.index(final)]
         path = path_from_root(RELATIVE_PATH + file)
-        volume = data("Data/servers.json", 100, str(channel.guild.id), "bots", str(self.bot.user.id),
-            "volume", filenotfound = None, keynotfound = None)
+        volume = (await guild_settings(self.bot, channel.guild.id)).volume
         source = DSC.FFmpegPCMAudio(path)
         source = DSC.PCMVolumeTransformer(source, volume/100)
         if vc.is_playing(): vc.stop()
-        vc.play(source, after = lambda x: self.tryloop(vc))
+        vc.play(source, after = lambda x: self.after_play(vc))
         vc.playing = file
         await self.Reactech.reactech_valid(ctx,
             f"Playing `{file}` in {vc.channel.mention}.")
@@ -409,8 +409,7 @@ class Sounds(CMDS.Cog):
             return await self.Reactech.reactech_channel(ctx, "🚫",
                 "Fadeout can last between 0 and 60 seconds.")
 
-        volume = data("Data/servers.json", 100, str(channel.guild.id), "bots", str(self.bot.user.id),
-            "volume", filenotfound = None, keynotfound = None)/100
+        volume = (await guild_settings(self.bot, channel.guild.id)).volume/100
         if time:
             for i in range(1, 26):
                 vc.source.volume = volume - i*volume/25
@@ -442,29 +441,31 @@ class Sounds(CMDS.Cog):
             return await self.Reactech.reactech_user(ctx, "⛔",
                 "You do not have permission to loop audio in this server.")
         
-        if value is None: looping = not data("Data/servers.json", False,
-            str(guild.id), "bots", str(self.bot.user.id), "looping",
-            filenotfound = None, keynotfound = None)
+        settings = await guild_settings(self.bot, guild.id)
+        if value is None: looping = not settings.looping
         else: looping = yes_no(value)
         if looping is None: return await self.Reactech.reactech_user(ctx,
             "⁉️", f"Value `{value.lower()}` could not resolve to a boolean.")
 
-        data("Data/servers.json", looping, str(guild.id), "bots", str(self.bot.user.id), "looping", read_only = False)
+        settings.looping = looping ; await settings.save()
         if looping: await self.Reactech.reactech_channel(ctx, "🔁", f"Looping enabled in `{guild}`.")
         else: await self.Reactech.reactech_channel(ctx, "⏯️", f"Looping disabled in `{guild}`.")
 
 
-    def tryloop(self, vc: DSC.VoiceProtocol, error: Exception = None) -> None:
+    def after_play(self, vc: DSC.VoiceProtocol) -> None:
+        """Called from the voice thread when a sound ends: schedule tryloop()."""
+        run_coroutine_threadsafe(self.tryloop(vc), self.bot.loop)
+
+
+    async def tryloop(self, vc: DSC.VoiceProtocol, error: Exception = None) -> None:
         try:
             if error: raise error
-            if not data("Data/servers.json", False,
-                str(vc.guild.id), "bots", str(self.bot.user.id), "looping",
-                filenotfound = None, keynotfound = None): return
-            volume = data("Data/servers.json", 100, str(vc.guild.id), "bots", str(self.bot.user.id),
-                "volume", filenotfound = None, keynotfound = None)
+            settings = await guild_settings(self.bot, vc.guild.id)
+            if not settings.looping: return
+            volume = settings.volume
             path = path_from_root(RELATIVE_PATH + vc.playing)
             source = DSC.PCMVolumeTransformer(DSC.FFmpegPCMAudio(path), volume/100)
-            vc.play(source, after = lambda x: self.tryloop(vc))
+            vc.play(source, after = lambda x: self.after_play(vc))
         except Exception as e:
             if isinstance(e, DSC.ClientException) and vc.source: return
             print(f"Loop error: {e.__class__.__name__}: {e}")
\ No newline at end of file
@@ -17,7 +17,7 @@ from discord.ext.commands.context import Context as CTX
 
 from Modules.basic import mixmatch
 from Modules.reactech import Reactech
-from Modules.data import data
+from Modules.guild import guild_settings
 
 
 
@@ -33,7 +33,7 @@ async def setup(bot: Bot):
 
 
 
-def get_prefix(bot_ctx: Bot|CTX, message: DSC.Message = None) -> str|list[str]:
+async def get_prefix(bot_ctx: Bot|CTX, message: DSC.Message = None) -> str|list[str]:
     """Return the bot prefix for the given message."""
     # Optionally extract the bot from the context
     bot = bot_ctx if isinstance(bot_ctx, Bot) else bot_ctx.bot
@@ -43,8 +43,7 @@ def get_prefix(bot_ctx: Bot|CTX, message: DSC.Message = None) -> str|list[str]:
     else: guild = bot_ctx.guild # Guild is given by context
     if not guild: return [bot.prefix, bot.user.mention] # DMs
     # If in guild, retreive the custom prefix by guild id
-    prefix = data("Data/servers.json", bot.prefix, str(guild.id),
-        "bots", str(bot.user.id), "prefix", keynotfound=None)
+    prefix = (await guild_settings(bot, guild.id)).prefix
     # Just in case, accept a bot ping to invoke commands
     return [prefix, bot.user.mention]
 
@@ -149,8 +148,8 @@ class Custom(CMDS.Cog):
             ctx, "❌", "Prefix must be between 1 and 3 characters.")
 
         # Save the new prefix under guild/bots/"prefix"
-        data("Data/servers.json", prefix, str(ctx.guild.id),
-            "bots", str(self.bot.user.id), "prefix", read_only=False)
+        settings = await guild_settings(self.bot, ctx.guild.id)
+        settings.prefix = prefix ; await settings.save()
         # If prefix contains backticks, escape them and use different enclosing
         sep = "" if "`" in prefix else '`'
         if "`" in prefix: prefix = prefix.replace("`", "\`")
@@ -16,15 +16,15 @@ from discord.ext import commands as CMDS
 from discord.ext.commands.bot import Bot
 from discord.ext.commands.context import Context as CTX
 
-from asyncio import wait_for, to_thread, TimeoutError
+from asyncio import TimeoutError
 from time import time
 
 from Extensions.Common import get_prefix
 from Modules.reactech import Reactech
-from Modules.logic import main as main_math
 from Modules.logic import get_args, is_num, _ARG_TIMEOUT, noresolve_stack
 from Modules.basic import isiterable, mixmatch, plural
-from Modules.dice import SOURCE, scuff, translate_dice, allow_scuff
+from Modules.dice import allow_scuff
+from Modules.engine import evaluate
 
 
 async def setup(bot: Bot):
@@ -75,9 +75,9 @@ def get_comm(txt: str) -> (str, str):
     return txt.replace(" ", ""), comment
 
 
-async def evaluate_args(args: list, dice: bool = False,
+async def evaluate_args(bot: Bot, args: list, dice: bool = False,
         is_scuff: bool = False, noresolve: bool = False) -> tuple:
-    """Evaluate the given args using main_math."""
+    """Evaluate the given args (in the worker processes of the bot if it has some)."""
     results = [] ; comms = [] ; stack = [] ; errors = [] ; start = time()
     for arg in args:
         try:
@@ -87,8 +87,8 @@ async def evaluate_args(args: list, dice: bool = False,
             comms.append(comm)
             noresolve_stack(stack, expr, "Commented", noresolve and comm)
             if time() - start > _ARG_TIMEOUT: raise TimeoutError()
-            result, had_dice = await wait_for(to_thread(solver,
-                expr, stack, start, dice, is_scuff, noresolve), _ARG_TIMEOUT)
+            result, had_dice = await evaluate(bot, _ARG_TIMEOUT,
+                expr, stack, start, dice, is_scuff, noresolve)
         except TimeoutError as e:
             results.append("TimeoutError")
             errors.append("'TimeoutError': Evaluation has timed out " +
@@ -111,21 +111,6 @@ async def evaluate_args(args: list, dice: bool = False,
     return results, comms, stack, errors, had_dice
 
 
-def solver(expr: str, stack: list, start: float, dice: bool = False,
-        is_scuff: bool = False, noresolve: bool = False) -> (any, bool):
-    if dice:
-        expr, had_dice = translate_dice(expr, is_scuff, stack if noresolve else None)
-        if had_dice:
-            noresolve_stack(stack, expr, "Translated", noresolve)
-            source = SOURCE.copy() if dice else {}
-            if is_scuff: source["scuff"] = scuff
-        else: source = None
-    else:
-        had_dice = False ; source = None
-    result = main_math(expr, stack, source, start, noresolve)[0]
-    return result, had_dice
-
-
 def ensure_size(result: any, size: int = 256) -> str:
     """Format the given argument into a proper output."""
     if isiterable(result) and len(result) == 1:
@@ -170,7 +155,7 @@ async def main(self: CMDS.Cog, ctx: CTX, txt: str,
     dice = bool(self.bot.get_cog("Roll"))
     scuff = allow_scuff(ctx)
     results, comms, stack, errors, had_dice = \
-        await evaluate_args(args, dice, scuff, noresolve)
+        await evaluate_args(self.bot, args, dice, scuff, noresolve)
     if noresolve:
         end = ["```"]
         while sum([len(s)+2 for s in stack]) > 1985:
@@ -244,7 +229,7 @@ class Automath(CMDS.Cog):
     async def on_message(self, msg: DSC.message.Message) -> None:
         if msg.author.bot: return # And not sent by a bot
         if msg.mentions or msg.role_mentions: return # No mentions
-        if msg.content.startswith(get_prefix(self.bot, msg)[0]): return # If it's not a bot command
+        if msg.content.startswith((await get_prefix(self.bot, msg))[0]): return # If it's not a bot command
         if len(msg.content) > 100: return # Don't treat big messages
         if len(msg.content) <= 1: return # Don't treat small messages
         await main(self, msg, msg.content, True)
@@ -23,6 +23,7 @@ from asyncio import gather
 
 from Modules.basic import *
 from Modules.reactech import Reactech
+from Modules.resources import reload_resources
 
 
 
@@ -253,6 +254,7 @@ class Plugins(CMDS.Cog):
                 if cog.__module__ in self.bot.extensions:
                     exts.add(cog.__module__.removeprefix("Extensions."))
             
+            if exts: reload_resources() # Static files are read again on next use
             for ext in exts: # Extensions
                 try: await self.bot.reload_extension("Extensions." + ext)
                 except CMDS.ExtensionNotLoaded:
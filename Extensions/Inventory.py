@@ -20,7 +20,8 @@ from math import log10
 
 from Extensions.Common import get_prefix
 from Modules.inv import *
-from Modules.data import data
+from Modules.resources import resource_txt
+from Modules.store import bot_data, bot_transaction
 from Modules.reactech import Reactech
 from Modules.discord_utils import DscConverter
 from Modules.basic import mixmatch, format_number
@@ -159,10 +160,11 @@ def inventory_modify(ctx: CTX, inventory: dict, user: DSC.User|DSC.Member,
     """
     Modify the inventory of a user.
     Handles give, remove, change, and clear actions.
+    The inventory is modified in place (saved by the caller's transaction).
     Returns a tuple (emoji, message) for feedback.
     """
     target_name = f"`{user.display_name}`'s" if ctx.author != user else "your"
-    inv = get_user_inv(inventory, user)
+    inv = dict(get_user_inv(inventory, user)) # Only saved if the change is valid
     item_data = get_item(inventory["items"], item)
     if not item_data and inventory["settings"]["strict"]:
         return "❓", f"Item {item} was not recognized."
@@ -177,7 +179,7 @@ def inventory_modify(ctx: CTX, inventory: dict, user: DSC.User|DSC.Member,
     if action == "clear":
         if not item:
             # Clear all items for the user
-            data("Data/servers.json", None, str(ctx.guild.id), "inventory", "users", str(user.id), read_only=False)
+            inventory["users"][str(user.id)] = None
             gather(log_action(ctx, inventory["logs"], "change", None, user))
             return "✅", f"Cleared {target_name} inventory."
         if present is True:
@@ -187,7 +189,7 @@ def inventory_modify(ctx: CTX, inventory: dict, user: DSC.User|DSC.Member,
                     del inv[item]
                 else:
                     inv[item] = base
-                data("Data/servers.json", inv, str(ctx.guild.id), "inventory", "users", str(user.id), read_only=False)
+                inventory["users"][str(user.id)] = inv
                 gather(log_change(ctx, inventory["logs"], item_data or item_name, old, base, user))
         return "✅", f"Removed {item_name} from {target_name} inventory."
 
@@ -230,7 +232,7 @@ def inventory_modify(ctx: CTX, inventory: dict, user: DSC.User|DSC.Member,
     base = item_data["base"] if item_data else inventory["item_default"]["base"]
     if new == 0 and base == 0:
         del inv[item]
-    data("Data/servers.json", inv, str(ctx.guild.id), "inventory", "users", str(user.id), read_only=False)
+    inventory["users"][str(user.id)] = inv
 
     # Prepare log and feedback message
     delta = new - old if action in ["give", "remove"] else new
@@ -272,7 +274,7 @@ class Inventory_base(CMDS.Cog):
         if not ctx.guild:
             return await self.Reactech.reactech_user(
                 ctx, "🚫", "This command can only be used in a server.")
-        inventory = data("Data/servers.json", None, str(ctx.guild.id), "inventory", keynotfound=None)
+        inventory = await bot_data(self.bot, "Data/servers.json", None, str(ctx.guild.id), "inventory", keynotfound=None)
         if not inventory:
             return await self.Reactech.reactech_user(ctx, "🚫",
                 "Inventory system is not setup on this server.\n" + 
@@ -364,7 +366,9 @@ class Inventory_base(CMDS.Cog):
             return await self.Reactech.reactech_channel(ctx, emoji, message)
 
         # Handle give/remove/change actions
-        result = inventory_modify(ctx, inventory, user, action, item, quantity)
+        # Read again, in case another command modified it while awaiting
+        async with bot_transaction(self.bot, "Data/servers.json", str(ctx.guild.id), "inventory") as inventory:
+            result = inventory_modify(ctx, inventory, user, action, item, quantity)
         if not result:
             return
         return await self.Reactech.reactech_channel(ctx, *result)
@@ -430,7 +434,7 @@ class Inventory_manage(CMDS.Cog):
         if not ctx.guild:
             return await self.Reactech.reactech_user(
                 ctx, "🚫", "This command can only be used in a server.")
-        inventory = data("Data/servers.json", None, str(ctx.guild.id), "inventory", keynotfound=None)
+        inventory = await bot_data(self.bot, "Data/servers.json", None, str(ctx.guild.id), "inventory", keynotfound=None)
         if not ctx.author.guild_permissions.administrator:
             if inventory:
                 gather(log_deny(ctx, inventory["logs"],
@@ -442,13 +446,13 @@ class Inventory_manage(CMDS.Cog):
         if not args or args[0].lower() in WORDS["help"] + WORDS["conf"]:
             msg = ""
             if not inventory:
-                data("Data/servers.json", SERVER_DEFAULTS, str(ctx.guild.id), "inventory", read_only=False)
+                await bot_data(self.bot, "Data/servers.json", SERVER_DEFAULTS, str(ctx.guild.id), "inventory", read_only=False)
             if args and args[0].lower() in WORDS["help"]:
-                msg += data("Resources/Files/Inventory/help.txt", filenotfound = False)
+                msg += resource_txt("Inventory/help.txt")
             else:
                 msg += "Inventory system has been initialized on this server.\n" + \
                     "Use `{prefix}manage_inventory help` to see how to configure it."
-            return await ctx.reply(msg.format(prefix=get_prefix(ctx)[0]))
+            return await ctx.reply(msg.format(prefix=(await get_prefix(ctx))[0]))
             
 
 
@@ -22,7 +22,8 @@ from io import StringIO
 
 from Modules.basic import least_one, mixmatch, removepunct
 from Modules.reactech import Reactech
-from Modules.data import data
+from Modules.store import bot_data_remove
+from Modules.guild import discard_settings
 from Modules.Twitch.eventsub import EventSubManager
 
 
@@ -124,10 +125,8 @@ class Setup(CMDS.Cog):
     @CMDS.Cog.listener()
     async def on_guild_leave(self, guild: DSC.Guild):
         """Remove server data when the bot leaves a guild."""
-        servers = data("Data/servers.json", read_only=True)
-        if str(guild.id) in servers:
-            del servers[str(guild.id)]
-            data("Data/servers.json", servers, read_only=False)
+        await bot_data_remove(self.bot, "Data/servers.json", str(guild.id))
+        discard_settings(self.bot, guild.id)
 
 
 
@@ -10,7 +10,8 @@ Action object representing a Twitch API call.
 
 
 
-from Modules.data import data
+from collections.abc import Mapping
+from Modules.resources import resource_json
 
 
 
@@ -21,7 +22,7 @@ from Modules.data import data
 
 
 _HELIX_URL = "https://api.twitch.tv/helix/"
-ACTIONS = data("Resources/Files/Twitch/actions.json", filenotfound = False)
+ACTIONS = resource_json("Twitch/actions.json")
 _TYPES = {"str": str, "int": int, "float": float, "bool": bool, "dict": dict, "list": list}
 
 
@@ -81,7 +82,7 @@ def check_requirements(input: dict, template: dict) -> dict:
     for k, v in input.items(): # For every entry provided
         if k not in template: # If it is not present in template
             raise ValueError(f"Unknown parameter '{k}'")
-        if isinstance(template[k], dict):
+        if isinstance(template[k], Mapping):
             # If nested dict, check recursively
             filled[k] = check_requirements(v, template[k])
         elif isinstance(template[k], str) and template[k] in _TYPES:
@@ -92,7 +93,7 @@ def check_requirements(input: dict, template: dict) -> dict:
 
     for k, v in template.items(): # For every entry in template
         if k in filled: continue # If already filled, skip
-        if isinstance(v, dict):
+        if isinstance(v, Mapping):
             # If nested dict, fill recursively
             filled[k] = check_requirements({}, v)
         elif v not in _TYPES:
@@ -15,7 +15,7 @@ from websockets import connect as ws_connect, ConnectionClosed
 import asyncio
 from aiohttp import ClientResponse
 from json import loads as json_loads
-from Modules.data import data
+from Modules.data import data, adata
 from Modules.Twitch.manager import TwitchManager
 from Modules.Twitch.action import Action
 from Modules.Twitch.subscription import Subscription
@@ -65,7 +65,7 @@ class EventSubManager(TwitchManager):
     async def _read_wanted(self, register: bool = True) -> None:
         """Load the wanted subscriptions from file and optionally register them."""
         # Retrieve wanted subscriptions from file (default {})
-        self.wanted = data(_DATA_PATH, {}, str(self.bot.user.id), filenotfound=None)
+        self.wanted = await adata(_DATA_PATH, {}, str(self.bot.user.id), filenotfound=None)
         if register: await self.register_all()
 
 
@@ -85,7 +85,7 @@ class TwitchManager:
         if "headers" in ACTIONS[action.type]:
             if action.headers is None:
                 # Set required headers from action template
-                action.headers = ACTIONS[action.type]["headers"]
+                action.headers = dict(ACTIONS[action.type]["headers"])
             # Fill in Client-ID and Authorization if needed
             if "Client-ID" in action.headers:
                 action.headers["Client-ID"] = self.app.twitch_id
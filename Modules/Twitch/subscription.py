@@ -12,7 +12,7 @@ Twitch EventSub subscription management.
 
 from discord.ext.commands import Bot
 from time import time
-from Modules.data import data
+from Modules.resources import resource_json
 from Modules.Twitch.action import Action, check_requirements
 from Modules.Twitch.handler import Handler
 
@@ -24,7 +24,7 @@ from Modules.Twitch.handler import Handler
 
 
 
-_SUBSCRIPTIONS = data("Resources/Files/Twitch/events.json", filenotfound = False)
+_SUBSCRIPTIONS = resource_json("Twitch/events.json")
 
 
 
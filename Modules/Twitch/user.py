@@ -15,6 +15,7 @@ from asyncpg import Pool
 from urllib.parse import urlencode
 from secrets import token_urlsafe
 from Modules.data import data
+from Modules.resources import resource_json
 from Modules.Twitch.action import Action
 
 
@@ -26,10 +27,10 @@ from Modules.Twitch.action import Action
 
 
 _OAUTH_URL = "https://id.twitch.tv/oauth2/authorize"
-SCOPES = data("Resources/Files/Twitch/scopes.json", filenotfound = False)
+SCOPES = resource_json("Twitch/scopes.json")
 REVERSE_SCOPES = {
     s: k for k, v in SCOPES.items() for s in
-    v.get("scopes", []) + v.get("hidden_scopes", [])
+    v.get("scopes", ()) + v.get("hidden_scopes", ())
 }
 
 
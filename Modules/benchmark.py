@@ -0,0 +1,262 @@
+"""
+Benchmarks of the data layer and of the logic evaluator, to compare implementations
+and catch regressions.
+Run with: python -m Modules.benchmark [--guilds 10,1000] [--count 1000] [--json out.json]
+Each case reports ops/sec and latency percentiles, as a table or as json.
+"""
+
+
+
+##################################################
+# IMPORTS
+##################################################
+
+
+
+from time import perf_counter
+from random import Random
+from platform import python_version, platform
+from argparse import ArgumentParser
+from shutil import rmtree
+from json import dumps
+
+from Modules.data import _CODECS, _CODEC, data, flush, discard, explore_struct, \
+    path_from_root, Accessor
+from Modules.logic import _NAMES, _SYMBOLS, canonical_name, match_symbol, \
+    tokenize, cleanup, compile_expression
+
+
+
+##################################################
+# GLOBALS
+##################################################
+
+
+
+_SOURCE = "Data/benchmark/servers.json" # Scratch file, deleted after the run
+_SIZES = (10, 1000, 10000) # Guilds per generated document by default
+# Every symbol longest first, as scanned before the trie
+_SCANNED = sorted(set(_SYMBOLS).union(*_SYMBOLS.values()), key = len, reverse = True)
+_EXPRESSIONS = ( # Sample logic expressions
+    "2+3*4", "sqrt(16)+1", "2pi*e^2", "(1+2)!-3²", "sum(keephigh(2,5,1,9))//2",
+    "iteravg(sum(iter(randint(1,6),3)),100)", "1>=2||3<=4&&not(false)", "maximum(1,2)**3%4"
+)
+
+
+
+##################################################
+# HELPERS
+##################################################
+
+
+
+def measure(function, *args, repeat: int = 5) -> float:
+    """Best time (seconds) of function(*args) over repeated calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        function(*args)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def timings(function, calls: list[tuple]) -> list[float]:
+    """Time (seconds) of function(*args) for each args of calls."""
+    times = []
+    for args in calls:
+        start = perf_counter()
+        function(*args)
+        times.append(perf_counter() - start)
+    return times
+
+
+def stats(suite: str, case: str, guilds: int|None, times: list[float]) -> dict:
+    """Result row of a case: ops/sec and latency percentiles (microseconds)."""
+    times = sorted(times) ; n = len(times)
+    return {
+        "suite": suite, "case": case, "guilds": guilds, "count": n,
+        "ops_per_sec": round(n / sum(times), 1) if sum(times) else None,
+        "p50_us": round(times[n // 2] * 1e6, 2),
+        "p99_us": round(times[min(n - 1, n * 99 // 100)] * 1e6, 2),
+        "max_us": round(times[-1] * 1e6, 2)
+    }
+
+
+def sample_document(guilds: int, seed: int = 0) -> dict:
+    """
+    Document shaped like Data/servers.json, with the given amount of guilds.
+    Every guild has bot settings, one in ten an inventory of 1 to 50 users.
+    """
+    rng = Random(seed) ; document = {}
+    for g in range(guilds):
+        guild = document[str(100000000000000000 + g)] = {
+            "bots": {"1234": {"prefix": "!", "volume": rng.randint(0, 200), "looping": False}}
+        }
+        if g % 10: continue
+        items = [f"item{i}" for i in range(rng.randint(1, 20))]
+        guild["inventory"] = {
+            "settings": {"slots": None, "capacity": None, "volume": None,
+                "strict": True, "secret": False, "default_item": None},
+            "items": {i: {"id": i, "name": i.title(), "base": 0, "min": 0, "max": "+∞",
+                "fractions": 1, "size": 1.5, "aliases": []} for i in items},
+            "users": {str(200000000000000000 + u): {i: rng.randint(1, 100)
+                for i in rng.sample(items, rng.randint(1, len(items)))}
+                for u in range(rng.randint(1, 50))},
+            "logs": {"change": [None, True], "error": None}
+        }
+    return document
+
+
+
+##################################################
+# SUITES
+##################################################
+
+
+
+def bench_data(guilds: int, count: int = 1000, seed: int = 0) -> list[dict]:
+    """
+    data() on a generated json file: cached reads of random paths,
+    a full load of the file, writes of random inventory quantities and their flush.
+    """
+    document = sample_document(guilds, seed) ; rng = Random(seed)
+    path = path_from_root(_SOURCE)
+    data(_SOURCE, document, read_only = False) ; flush()
+    keys = list(document)
+    with_inv = [k for k in keys if "inventory" in document[k]]
+    rows = []
+
+    reads = [(_SOURCE, None, rng.choice(keys), "bots", "1234", "volume") for _ in range(count)]
+    rows.append(stats("data", "read", guilds, timings(data, reads)))
+    deep = [(_SOURCE, None, k, "inventory", "users") for k in rng.choices(with_inv, k = count)]
+    rows.append(stats("data", "read_subtree", guilds, timings(data, deep)))
+
+    def cold() -> None: discard(path) ; data(_SOURCE, None, keys[0])
+    rows.append(stats("data", "load", guilds, timings(cold, [()] * max(1, min(20, count)))))
+
+    writes = [(_SOURCE, rng.randint(1, 100), k, "inventory", "users", "1", "item0")
+        for k in rng.choices(with_inv, k = count)]
+    rows.append(stats("data", "write", guilds, timings(lambda *a: data(*a, read_only = False), writes)))
+    flushes = []
+    for _ in range(max(1, min(10, count // 100))):
+        data(_SOURCE, rng.randint(1, 100), keys[0], "bots", "1234", "volume", read_only = False)
+        flushes += timings(flush, [()])
+    rows.append(stats("data", "flush", guilds, flushes))
+
+    discard(path) ; rmtree(path_from_root(_SOURCE.rsplit("/", 1)[0]), ignore_errors = True)
+    return rows
+
+
+def bench_depth(depths: tuple = (1, 4, 16, 64), count: int = 1000) -> list[dict]:
+    """Cost of exploring a structure by key depth: explore_struct() and Accessor.find()."""
+    rows = []
+    for depth in depths:
+        keys = tuple(f"k{i}" for i in range(depth))
+        struct = value = {}
+        for key in keys[:-1]: value[key] = {} ; value = value[key]
+        value[keys[-1]] = 1
+        rows.append(stats("depth", f"explore_struct.{depth}", None,
+            timings(explore_struct, [(struct, None, *keys)] * count)))
+        rows.append(stats("depth", f"accessor.{depth}", None,
+            timings(Accessor.find, [(struct, keys)] * count)))
+    return rows
+
+
+def bench_codecs(sizes: tuple = _SIZES, count: int = 5, seed: int = 0) -> list[dict]:
+    """Load and dump times of every installed json codec, indented and compact."""
+    rows = []
+    for size in sizes:
+        document = sample_document(size, seed)
+        for name, (loads, dumps) in _CODECS.items():
+            pretty, compact = dumps(document), dumps(document, True)
+            rows.append(stats("codec", f"{name}.load", size, timings(loads, [(pretty,)] * count)))
+            rows.append(stats("codec", f"{name}.dump", size, timings(dumps, [(document,)] * count)))
+            rows.append(stats("codec", f"{name}.load_compact", size, timings(loads, [(compact,)] * count)))
+            rows.append(stats("codec", f"{name}.dump_compact", size,
+                timings(dumps, [(document, True)] * count)))
+    return rows
+
+
+def scan_alias(name: str) -> str:
+    """Alias lookup as it was done before the reverse map: a scan of every function."""
+    for key, value in _NAMES.items():
+        if name in value: return key
+    return name
+
+
+def scan_symbol(txt: str, i: int) -> tuple[str, int]|None:
+    """Symbol lookup as it was done before the trie: every symbol, longest first."""
+    for symbol in _SCANNED:
+        if txt.startswith(symbol, i): break
+    else: return None
+    for key, value in _SYMBOLS.items():
+        if symbol == key or symbol in value: return key, len(symbol)
+
+
+def bench_logic(count: int = 1000) -> list[dict]:
+    """
+    Lookups of every alias and symbol: by scan (previous behaviour) and by table.
+    Tokenizing and parsing (uncached) of sample expressions.
+    """
+    aliases = [(a,) for value in _NAMES.values() for a in value]
+    symbols = [(s, 0) for key, value in _SYMBOLS.items() for s in (key, *value)]
+    expressions = [cleanup(e) for e in _EXPRESSIONS]
+    repeat = max(1, count // len(expressions))
+    return [
+        stats("logic", "alias.scan", None, timings(scan_alias, aliases * max(1, count // len(aliases)))),
+        stats("logic", "alias.map", None, timings(canonical_name, aliases * max(1, count // len(aliases)))),
+        stats("logic", "symbol.scan", None, timings(scan_symbol, symbols * max(1, count // len(symbols)))),
+        stats("logic", "symbol.trie", None, timings(match_symbol, symbols * max(1, count // len(symbols)))),
+        stats("logic", "tokenize", None, timings(tokenize, [(e,) for e in expressions] * repeat)),
+        stats("logic", "parse", None, timings(compile_expression.__wrapped__,
+            [(e,) for e in _EXPRESSIONS] * repeat))
+    ]
+
+
+def run(sizes: tuple = _SIZES, count: int = 1000, seed: int = 0) -> dict:
+    """Run every suite and return the report (environment and result rows)."""
+    results = []
+    for size in sizes: results += bench_data(size, count, seed)
+    results += bench_depth(count = count)
+    results += bench_codecs(sizes, max(1, min(10, count // 100)), seed)
+    results += bench_logic(count)
+    return {
+        "python": python_version(), "platform": platform(), "codec": _CODEC,
+        "seed": seed, "results": results
+    }
+
+
+def print_rows(rows: list[dict]) -> None:
+    """Print result rows as an aligned table."""
+    if not rows: return
+    columns = list(rows[0])
+    cells = [["-" if v is None else str(v) for v in row.values()] for row in rows]
+    widths = [max(len(c), *(len(r[i]) for r in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells: print("  ".join(v.ljust(w) if i < 2 else v.rjust(w)
+        for i, (v, w) in enumerate(zip(r, widths))))
+
+
+
+##################################################
+# MAIN
+##################################################
+
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(prog = "python -m Modules.benchmark", description = __doc__.strip())
+    parser.add_argument("--guilds", default = ",".join(map(str, _SIZES)),
+        help = "comma separated document sizes, in guilds (up to 100000)")
+    parser.add_argument("--count", type = int, default = 1000, help = "operations per case")
+    parser.add_argument("--seed", type = int, default = 0, help = "seed of generated documents")
+    parser.add_argument("--json", metavar = "FILE", help = "write the report as json ('-' for stdout)")
+    args = parser.parse_args()
+
+    report = run(tuple(int(g) for g in args.guilds.split(",")), args.count, args.seed)
+    if args.json == "-": print(dumps(report, indent = 4))
+    else:
+        print(f"Python {report['python']}, json codec in use: {report['codec']}")
+        print_rows(report["results"])
+        if args.json:
+            with open(args.json, 'w', encoding="utf-8") as F: F.write(dumps(report, indent = 4))
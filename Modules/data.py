@@ -11,8 +11,21 @@ Local formats (txt, json, local bd) or external (bd, endpoints...).
 
 
 
-from os import path as os_path, sep as os_sep, makedirs
-from json import load, dump
+from os import path as os_path, sep as os_sep, makedirs, stat, listdir
+from os import replace, remove, link, chmod, fsync, fdopen, O_RDONLY
+from os import open as os_open, close as os_close
+from tempfile import mkstemp
+from shutil import copy2
+from json import loads, dumps
+from copy import deepcopy
+from mmap import mmap, ACCESS_READ
+from threading import RLock, Timer
+from asyncio import Lock as AsyncLock, get_running_loop
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from contextlib import contextmanager, asynccontextmanager
+from atexit import register
+from re import compile as re_compile
 
 
 
@@ -29,6 +42,37 @@ _DATA_FORMATS = {
     "json": "{}"
 }
 
+# Rolling backup generations kept when overwriting a file ('<file>.1' is the latest)
+# Keys ending with '/' apply to every file of the directory
+_BACKUPS = {
+    "Data/servers.json": 1,
+    "Data/servers/": 1
+}
+
+# Files whose changes are appended to '<file>.journal' instead of rewriting them,
+# with the size (bytes) of journal above which it is compacted into the file
+_JOURNALS = {
+    "Data/servers/": 64 * 1024
+}
+
+# Files written without indentation (smaller and faster), for those only the bot reads
+_COMPACT = {
+    "Data/eventsub.json": True,
+    "Data/audio.json": True
+}
+
+_FLUSH_DELAY = 1 # Seconds to batch writes before flushing them to disk
+_MISSING = object() # Sentinel for keys absent from a structure
+
+try: from os import O_DIRECTORY # Directories can only be synced on POSIX
+except ImportError: O_DIRECTORY = None
+try: from fcntl import flock, LOCK_EX, LOCK_UN # Advisory locks are POSIX only
+except ImportError: flock = None
+try: import orjson # Optional, fastest json codec
+except ImportError: orjson = None
+try: import ujson # Optional, faster json codec
+except ImportError: ujson = None
+
 
 
 ##################################################
@@ -49,6 +93,11 @@ def path_from_root(txt: str = "") -> str:
     return os_path.normpath(path)
 
 
+def path_to_root(path: str) -> str:
+    """Inverse of path_from_root(): local path (with '/') of an absolute path."""
+    return os_path.relpath(path, _ROOT).replace(os_sep, '/')
+
+
 def ensure_file(source: str, value: str, read_only: bool|None, filenotfound: bool|None) -> str|None:
     """
     Ensure the given file (path relative to project root) exists.
@@ -69,6 +118,132 @@ def ensure_file(source: str, value: str, read_only: bool|None, filenotfound: boo
     return path
 
 
+def write_file(path: str, txt: str|bytes) -> None:
+    """
+    Atomically replace the content of the file at the given absolute path.
+    The text (or utf-8 bytes) goes to a temporary file in the same directory, is synced
+    to disk, then renamed over the target: a crash leaves either the old or the new file.
+    """
+    directory = os_path.dirname(path)
+    fd, temp = mkstemp(dir = directory, prefix = "." + os_path.basename(path), suffix = ".tmp")
+    try:
+        with (fdopen(fd, "wb") if isinstance(txt, bytes) else fdopen(fd, "w", encoding="utf-8")) as F:
+            F.write(txt) ; F.flush() ; fsync(F.fileno())
+        if os_path.isfile(path): # Keep permissions and backups of the replaced file
+            chmod(temp, stat(path).st_mode)
+            rotate_backups(path, file_option(_BACKUPS, path))
+        replace(temp, path) # Atomic on both POSIX and Windows
+    except BaseException:
+        if os_path.isfile(temp): remove(temp)
+        raise
+    sync_directory(directory) # Make the rename itself durable
+
+
+def seal_file(path: str) -> None:
+    """Drop a last line left without line break (cut by a crash), so the next line starts on its own."""
+    try: F = open(path, 'r+b')
+    except FileNotFoundError: return
+    with F:
+        end = F.seek(0, 2)
+        if end == 0: return
+        F.seek(end - 1)
+        if F.read(1) == b"\n": return
+        position = end
+        while position > 0: # Back to the last line break, by chunks
+            start = max(0, position - 4096) ; F.seek(start)
+            i = F.read(position - start).rfind(b"\n")
+            if i != -1: position = start + i + 1 ; break
+            position = start
+        F.truncate(position) ; F.flush() ; fsync(F.fileno())
+
+
+def append_file(path: str, txt: str) -> None:
+    """
+    Append text to the file at the given absolute path and sync it to disk,
+    after dropping a last line cut by a crash.
+    """
+    seal_file(path)
+    with open(path, 'a', encoding="utf-8") as F:
+        F.write(txt) ; F.flush() ; fsync(F.fileno())
+
+
+def file_option(options: dict, path: str) -> int:
+    """
+    Return the option of a file (absolute path) from a dict of local paths,
+    where keys ending with '/' apply to every file of the directory (0 if none).
+    """
+    local = path_to_root(path)
+    return next((n for k, n in options.items()
+        if local == k or k.endswith('/') and local.startswith(k)), 0)
+
+
+def rotate_backups(path: str, generations: int) -> None:
+    """Shift '<path>.1'...'<path>.N' by one and save the current file as '<path>.1'."""
+    if generations <= 0: return
+    for i in range(generations - 1, 0, -1):
+        if os_path.isfile(f"{path}.{i}"): replace(f"{path}.{i}", f"{path}.{i+1}")
+    if os_path.isfile(f"{path}.1"): remove(f"{path}.1")
+    try: link(path, f"{path}.1") # Hard link: the old content survives the rename
+    except OSError: copy2(path, f"{path}.1") # Filesystem without hard links
+
+
+def sync_directory(directory: str) -> None:
+    """Flush directory entries (renames) to disk, where the OS allows it."""
+    if O_DIRECTORY is None: return
+    fd = os_open(directory, O_RDONLY | O_DIRECTORY)
+    try: fsync(fd)
+    finally: os_close(fd)
+
+
+def orjson_dumps(value: any, compact: bool = False) -> str:
+    # orjson only indents by 2 spaces
+    return orjson.dumps(value, option = orjson.OPT_NON_STR_KEYS
+        | (0 if compact else orjson.OPT_INDENT_2)).decode("utf-8")
+
+
+def ujson_dumps(value: any, compact: bool = False) -> str:
+    return ujson.dumps(value, ensure_ascii = False,
+        escape_forward_slashes = False, indent = 0 if compact else 4)
+
+
+def json_dumps(value: any, compact: bool = False) -> str:
+    return dumps(value, separators = (",", ":")) if compact else dumps(value, indent = 4)
+
+
+# Json codecs by name, as (loads, dumps), from the fastest one
+_CODECS = {name: codec for name, codec in {
+    "orjson": orjson and (orjson.loads, orjson_dumps),
+    "ujson": ujson and (ujson.loads, ujson_dumps),
+    "json": (loads, json_dumps)
+}.items() if codec}
+_CODEC = next(iter(_CODECS)) # Name of the codec in use
+# Integer literals of 19 digits or more, which may not fit in 64 bits (faster codecs lose them)
+_LONG_INT = re_compile(r"\d{19,}")
+_LONG_INT_BYTES = re_compile(rb"\d{19,}")
+
+
+def decode(txt: str|bytes) -> any:
+    """
+    Parse json text (or utf-8 bytes) with the selected codec.
+    Texts with integers that may not fit in 64 bits are parsed by the standard library,
+    as faster codecs would turn them into floats (or fail).
+    """
+    if _CODEC != "json" and (_LONG_INT_BYTES if isinstance(txt, bytes) else _LONG_INT).search(txt):
+        return loads(txt)
+    return _CODECS[_CODEC][0](txt)
+
+
+def encode(value: any, compact: bool = False) -> str:
+    """
+    Serialize to json text with the selected codec (indented unless compact).
+    Values it cannot handle (like ints over 64 bits) fall back to the standard library.
+    """
+    try: return _CODECS[_CODEC][1](value, compact)
+    except (TypeError, ValueError, OverflowError):
+        if _CODEC == "json": raise
+        return json_dumps(value, compact)
+
+
 def explore_struct(struct: dict|list, value = None, *keys: str|int,
         read_only: bool = True, keynotfound: bool|None = None) -> bool:
     """
@@ -135,6 +310,412 @@ def explore_struct(struct: dict|list, value = None, *keys: str|int,
 
 
 
+##################################################
+# CACHE
+##################################################
+
+
+
+class Document:
+    """
+    Parsed content of a json file, kept in memory between calls.
+    The content is reloaded when the file changes on disk (by mtime and size),
+    and written back by flush() only if it was modified (dirty).
+    Changes are also kept as operations until flushed, so they can be
+    replayed over a version of the file written by another process.
+    Journaled files (_JOURNALS) get these operations appended to '<file>.journal',
+    which is replayed on load and compacted into the file once too large.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.journal = file_option(_JOURNALS, path) # Compaction size, 0 if not journaled
+        self.compact = file_option(_COMPACT, path) # Written without indentation
+        self.content = None
+        self.stamp = None # (mtime, size) of the file and of its journal when last synced
+        self.dirty = False
+        self.pending = [] # (keys, value, read_only) written since last flush
+        self.lock = RLock() # Guards content against the flushing thread
+
+
+    def signature(self) -> tuple:
+        """Current stamps of the file and of its journal (None if absent)."""
+        return (file_stamp(self.path),
+            file_stamp(self.path + ".journal") if self.journal else None)
+
+
+    def refresh(self) -> None:
+        """Reload the content from disk if the file changed since last sync."""
+        stamp = self.signature()
+        if stamp[0] is None or stamp == self.stamp: return
+        with open(self.path, 'rb') as F: self.content = decode(F.read())
+        if stamp[1] is not None: # Changes made since the last compaction
+            for keys, value, read_only in self.read_journal():
+                self.apply(value, *keys, read_only = read_only)
+        self.stamp = stamp
+        # Changes not flushed yet still apply over the new version
+        for keys, value, read_only in self.pending:
+            self.apply(value, *keys, read_only = read_only)
+
+
+    def apply(self, value, *keys, read_only: bool|None = False) -> None:
+        """
+        Write the value at keys (whole content if none), creating missing keys.
+        A _MISSING value removes the last key from its parent instead.
+        """
+        if value is _MISSING:
+            parent = explore_struct(self.content, None, *keys[:-1], read_only = True,
+                keynotfound = None) if len(keys) > 1 else self.content
+            if isinstance(parent, dict): parent.pop(keys[-1], None)
+            elif isinstance(parent, list) and keys[-1] in range(len(parent)): del parent[keys[-1]]
+        elif not keys:
+            if read_only is False or not self.content: self.content = value
+        else: explore_struct(self.content, value, *keys,
+            read_only = read_only, keynotfound = True)
+
+
+    def read_journal(self) -> list[tuple]:
+        """Operations recorded in the journal, as (keys, value, read_only)."""
+        ops = []
+        with open(self.path + ".journal", 'r', encoding="utf-8") as F:
+            for line in F:
+                try: record = decode(line)
+                except ValueError: continue # Record cut by a crash, never applied
+                # [keys] alone is a removal, [keys, value, read_only] a write
+                ops.append((record[0], _MISSING, False) if len(record) == 1 else tuple(record))
+        return ops
+
+
+    def write(self, value, *keys, read_only: bool|None = False) -> None:
+        """Apply a change, record it and schedule the flush."""
+        self.apply(value, *keys, read_only = read_only)
+        self.record(value, *keys, read_only = read_only)
+
+
+    def record(self, value, *keys, read_only: bool|None = False) -> None:
+        """Record a change already made to the content and schedule the flush."""
+        self.pending.append((keys, value, read_only))
+        mark_dirty(self)
+
+
+    def flush(self) -> None:
+        """Write the content to disk if it was modified."""
+        if not self.dirty: return # Checked again under the lock
+        with file_lock(self.path): # Writers from other processes wait here
+            with self.lock:
+                if not self.dirty: return
+                self.refresh() # Merge what they wrote since our last sync
+                journal = self.stamp[1][1] if self.stamp and self.stamp[1] else 0
+                if self.journal and self.stamp and journal < self.journal:
+                    # Only the changes go to disk, the file is left untouched
+                    txt = "".join(encode([list(keys)] if value is _MISSING else
+                        [list(keys), value, read_only], compact = True) + "\n"
+                        for keys, value, read_only in self.pending)
+                    rewrite = False
+                else: txt = encode(self.content, self.compact) ; rewrite = True
+                flushed = len(self.pending) ; self.dirty = False
+            # Slowest part (disk sync), without blocking readers and writers
+            if not rewrite: append_file(self.path + ".journal", txt)
+            else:
+                write_file(self.path, txt)
+                # The file now holds the journal (replaying it again would be harmless)
+                if journal: remove(self.path + ".journal")
+            with self.lock: # Changes made meanwhile stay pending (and dirty)
+                # The written content is known, so there is no need to read it back
+                self.stamp = self.signature()
+                del self.pending[:flushed]
+
+
+class Lines:
+    """
+    Line index of a txt file, kept in memory between calls.
+    The file is memory-mapped and the start offset of every line recorded,
+    so reading a line costs a slice of the mapping instead of a full read.
+    The index is rebuilt when the file changes on disk (by mtime and size).
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.stamp = None # (mtime, size) of the file when indexed
+        self.map = None # Read-only mapping of the file, None if empty
+        self.starts = [] # Offset of the first byte of each line
+        self.lock = RLock()
+
+
+    def close(self) -> None:
+        """Close the mapping (a mapped file cannot be replaced on Windows), until next refresh()."""
+        if self.map is not None: self.map.close()
+        self.map = None ; self.stamp = None ; self.starts = []
+
+
+    def refresh(self) -> None:
+        """Index the file again if it changed since last time."""
+        stamp = file_stamp(self.path)
+        if stamp == self.stamp: return
+        self.close()
+        if stamp is not None and stamp[1] > 0: # Empty files cannot be mapped
+            with open(self.path, 'rb') as F: self.map = mmap(F.fileno(), 0, access = ACCESS_READ)
+            find, size = self.map.find, len(self.map)
+            self.starts.append(0) ; i = find(b"\n")
+            while i != -1 and i + 1 < size: # A final line break does not start a line
+                self.starts.append(i + 1) ; i = find(b"\n", i + 1)
+        self.stamp = stamp
+
+
+    def span(self, index: int) -> tuple[int, int]:
+        """Start and end offsets of a line, without its line break."""
+        start = self.starts[index]
+        if index + 1 < len(self.starts): return start, self.starts[index + 1] - 1
+        end = len(self.map)
+        return start, end - 1 if self.map[end - 1:end] == b"\n" else end
+
+
+    def count(self) -> int:
+        """Number of lines in the file."""
+        with self.lock: self.refresh() ; return len(self.starts)
+
+
+    def line(self, index: int) -> str|None:
+        """Content of a line, None if there is no such line."""
+        with self.lock:
+            self.refresh()
+            if not 0 <= index < len(self.starts): return None
+            start, end = self.span(index)
+            return self.map[start:end].decode("utf-8")
+
+
+    def text(self) -> str:
+        """Content of the whole file (without its final line break)."""
+        with self.lock:
+            self.refresh()
+            return "" if self.map is None else self.map[:].decode("utf-8").removesuffix("\n")
+
+
+    def write(self, txt: str) -> None:
+        """Replace the content of the whole file."""
+        with file_lock(self.path), self.lock:
+            self.close() ; write_file(self.path, txt) ; self.refresh()
+
+
+    def set(self, index: int, txt: str, empty_only: bool = False) -> str:
+        """
+        Write a line, adding empty lines before it if the file is shorter.
+        A line of the same size is overwritten in place, other changes rewrite the file.
+        With empty_only, an existing non-empty line is kept instead. Return the line.
+        """
+        encoded = txt.encode("utf-8")
+        with file_lock(self.path), self.lock:
+            self.refresh()
+            count = len(self.starts)
+            if index < count:
+                start, end = self.span(index)
+                if empty_only and end > start: return self.map[start:end].decode("utf-8")
+                if end - start == len(encoded) and b"\n" not in encoded:
+                    self.close() # Not written to while mapped
+                    with open(self.path, 'r+b') as F:
+                        F.seek(start) ; F.write(encoded) ; F.flush() ; fsync(F.fileno())
+                    self.refresh()
+                    return txt
+                content = self.map[:start] + encoded + self.map[end:]
+            else:
+                content = b"" if self.map is None else self.map[:]
+                if content and not content.endswith(b"\n"): content += b"\n"
+                content += b"\n" * (index - count) + encoded
+            self.close() ; write_file(self.path, content) ; self.refresh()
+        return txt
+
+
+_DOCUMENTS = {} # Absolute path -> Document
+_LINES = {} # Absolute path -> Lines
+_LOCK = RLock() # Guards _DOCUMENTS, _LINES and _TIMER
+_TIMER = None # Pending flush, shared by every document
+_ASYNC_LOCKS = {} # Absolute path -> asyncio.Lock
+
+
+def file_stamp(path: str) -> tuple|None:
+    """Return a cheap signature of the file state (mtime, size), None if missing."""
+    try: info = stat(path)
+    except FileNotFoundError: return None
+    return info.st_mtime_ns, info.st_size
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Hold an exclusive advisory lock on '<path>.lock' (shared by all processes).
+    Without fcntl (Windows), only one bot runs per console so this is a no-op.
+    """
+    if flock is None: yield ; return
+    with open(path + ".lock", "a") as F:
+        flock(F.fileno(), LOCK_EX)
+        try: yield
+        finally: flock(F.fileno(), LOCK_UN)
+
+
+def data_lock(source: str) -> AsyncLock:
+    """
+    Return the asyncio lock of a source (path relative to project root).
+    Coroutines doing read-modify-write sequences across awaits should hold it,
+    while plain reads can proceed without it off the cached snapshot.
+    """
+    return _ASYNC_LOCKS.setdefault(path_from_root(source), AsyncLock())
+
+
+def get_document(path: str) -> Document:
+    """Return the up-to-date cached document for the given absolute path."""
+    with _LOCK:
+        document = _DOCUMENTS.get(path)
+        if document is None: document = _DOCUMENTS[path] = Document(path)
+    with document.lock: document.refresh()
+    return document
+
+
+def get_lines(path: str) -> Lines:
+    """Return the cached line index for the given absolute path."""
+    with _LOCK:
+        lines = _LINES.get(path)
+        if lines is None: lines = _LINES[path] = Lines(path)
+    return lines
+
+
+def mark_dirty(document: Document) -> None:
+    """Flag the document as modified and schedule a flush (see Document.write)."""
+    global _TIMER
+    document.dirty = True
+    with _LOCK: # Writes happening within the delay are flushed together
+        if _TIMER is not None: return
+        _TIMER = Timer(_FLUSH_DELAY, flush)
+        _TIMER.daemon = True
+        _TIMER.start()
+
+
+def flush() -> None:
+    """Write every modified document to disk."""
+    global _TIMER
+    with _LOCK:
+        if _TIMER is not None: _TIMER.cancel()
+        _TIMER = None
+        documents = list(_DOCUMENTS.values())
+    for document in documents: document.flush()
+
+register(flush) # Never lose pending writes on exit
+
+
+def discard(path: str) -> None:
+    """Forget the cached document of a file (after deleting it)."""
+    with _LOCK: _DOCUMENTS.pop(path, None)
+
+
+def detach(value: any) -> any:
+    """Copy mutable structures so callers never hold references to cached content."""
+    return deepcopy(value) if isinstance(value, (dict, list)) else value
+
+
+
+##################################################
+# BACKENDS
+##################################################
+
+
+
+class Sharded:
+    """
+    Storage backend splitting a json source into one file per first key.
+    data("Data/servers.json", value, guild_id, ...) is then stored in
+    "Data/servers/<guild_id>.json", so a write only rewrites that guild.
+    A missing shard is handled like a missing key (see keynotfound).
+    """
+    def __init__(self, source: str, directory: str) -> None:
+        self.source = source
+        self.directory = directory.removesuffix("/") + "/"
+        self.migrated = False
+
+
+    def shard(self, key: str) -> str:
+        """Return the shard source (relative to project root) for the first key."""
+        if not isinstance(key, str) or not key.replace("_", "").replace("-", "").isalnum():
+            raise ValueError(f"Cannot use '{key}' as a shard of {self.source}")
+        return f"{self.directory}{key}.json"
+
+
+    def load(self) -> None:
+        """Import the monolithic file on first use."""
+        if not self.migrated: migrate(self.source) ; self.migrated = True
+
+
+    def keys(self) -> list:
+        """Return the first keys of every existing shard."""
+        directory = path_from_root(self.directory)
+        if not os_path.isdir(directory): return []
+        return [f.removesuffix(".json") for f in listdir(directory) if f.endswith(".json")]
+
+
+    def data(self, value = None, *keys, read_only: bool|None = True,
+            filenotfound: bool|None = True, keynotfound: bool|None = True) -> any:
+        """Same as data(), with filenotfound applying to the whole directory."""
+        self.load()
+        if not os_path.isdir(path_from_root(self.directory)):
+            if filenotfound is False: raise FileNotFoundError(
+                f"{path_from_root(self.directory)} was not found in given directory")
+            elif filenotfound is None or read_only is True:
+                return value if read_only else False
+        if not keys: return self.data_all(value, read_only = read_only)
+
+        shard = self.shard(keys[0])
+        if not os_path.isfile(path_from_root(shard)) and keynotfound is not True:
+            if keynotfound is False: raise KeyError(f"{keys[0]} was not found in {self.source}")
+            return value if read_only is not False else False
+        return data(shard, value, *keys[1:], read_only = read_only, keynotfound = keynotfound)
+
+
+    def data_all(self, value = None, read_only: bool|None = True) -> any:
+        """Read or write every shard at once, as one document."""
+        content = {k: data(self.shard(k)) for k in self.keys()}
+        if read_only is True or (read_only is None and content):
+            return content or value
+        # Rewrite the given shards and delete the others
+        value = value or {}
+        for key in content.keys() - value.keys(): self.remove(key)
+        for key, shard in value.items(): data(self.shard(key), shard, read_only = False)
+        return value if read_only is None else True
+
+
+    def remove(self, key: str) -> bool:
+        """Delete the shard of the given first key. Return whether it existed."""
+        path = path_from_root(self.shard(key))
+        with file_lock(path):
+            if not os_path.isfile(path): return False
+            remove(path) ; discard(path)
+            if os_path.isfile(path + ".journal"): remove(path + ".journal")
+        return True
+
+
+# Sources stored with another backend than their own file
+_BACKENDS = {
+    "Data/servers.json": Sharded("Data/servers.json", "Data/servers/")
+}
+
+
+def migrate(source: str) -> int|None:
+    """
+    Move the content of a monolithic json file into its sharded backend.
+    Existing shards are kept, and the file is renamed '<file>.migrated'.
+    Return the number of migrated keys (None if there was nothing to migrate).
+    """
+    backend = _BACKENDS[source] ; path = path_from_root(source)
+    if not os_path.isfile(path): return None
+    flush() # Ensure the file holds every pending change
+    # Another process starting on the same directory migrates it at most once
+    with file_lock(path):
+        if not os_path.isfile(path): return None # Migrated meanwhile
+        with open(path, 'rb') as F: content = decode(F.read())
+        for key, value in content.items():
+            data(backend.shard(key), value, read_only = None)
+        # Shards must be on disk before the source disappears (flush() would lock the source again)
+        for key in content: get_document(path_from_root(backend.shard(key))).flush()
+        replace(path, path + ".migrated") ; discard(path)
+    return len(content)
+
+
+
 ##################################################
 # FUNCTIONS
 ##################################################
@@ -168,6 +749,8 @@ def data(source: str, value = None, *keys, read_only: bool|None = True,
     TXT file treats the data as an array (per line) in terms of keys,
     but will always return the requested value as a string
     """
+    if source in _BACKENDS: return _BACKENDS[source].data(value, *keys, read_only = read_only,
+        filenotfound = filenotfound, keynotfound = keynotfound)
     format = source.split(".")[-1] # Get the file extension
     # If it's nonexistent, not recognized or not handled, raise error
     if format not in _DATA_FORMATS: raise ValueError(f"Cannot get data from source {source}")
@@ -182,6 +765,26 @@ def data(source: str, value = None, *keys, read_only: bool|None = True,
     else: raise NotImplementedError(f"Data format '{format}' is not yet implemented")
 
 
+def data_remove(source: str, *keys) -> bool:
+    """
+    Remove the entry at keys from a json source (path relative to project root).
+    Return whether the entry existed.
+    """
+    if not keys: raise IndexError("Must provide at least one key arg")
+    if source in _BACKENDS:
+        backend = _BACKENDS[source]
+        if len(keys) == 1: return backend.remove(keys[0])
+        source = backend.shard(keys[0]) ; keys = keys[1:]
+    path = ensure_file(source, _DATA_FORMATS["json"], True, None)
+    if path is None: return False
+    document = get_document(path)
+    with document.lock:
+        if explore_struct(document.content, _MISSING, *keys,
+            read_only = True, keynotfound = None) is _MISSING: return False
+        document.write(_MISSING, *keys)
+    return True
+
+
 def data_txt(path: str, value = None, *keys, read_only: bool = True,
         keynotfound: bool|None = True) -> str|bool:
     """
@@ -189,34 +792,31 @@ def data_txt(path: str, value = None, *keys, read_only: bool = True,
     See data() for more information on function parameters
     Note that keys[0] (if provided) must be an integer index,
     and keys[1:] will be ingored
+    Lines are read through a cached index (see Lines), not the whole file
     """
-    # Open the file and get its content
-    with open(path, 'r', encoding="utf-8") as F:
-        # Remember that each line finishes by "\n" by default
-        content = [l.removesuffix("\n") for l in F.readlines()]
-
+    lines = get_lines(path)
     if not keys: # If the content is the whole file
-        # If it's write-only or content is null, content is default value
-        if read_only is False or not content: content = "\n".split(value)
-        out = "\n".join(content) # Output is just content as a string
-
-    else: # If a key is specified (looking for a line)
-        if keys[0] >= len(content): # If doesn't exist
-            # False means we want to raise IndexError
-            if keynotfound is False: raise IndexError(f"Index {keys[0]} is out of range")
-            # None means we ignore and return early
-            elif keynotfound is None: return False if read_only is False else value
-            # Otherwise, we expand the array to be able to contain the value
-            content = [content[i] if i < len(content) else "" for i in range(keys[0]+1)]
-
-        if read_only is True: return value # No writing to do ; return default
-        # Writing requested or needed (default value)
-        if read_only is False or not content[keys[0]]: content[keys[0]] = value
-        out = content[keys[0]] # Output is the specified line
-
-    if read_only is True: return out # No writing ; return output
-    # Write to file, each list element separated by a line break
-    with open(path, "w", encoding="utf-8") as F: F.write("\n".join(content))
+        content = lines.text()
+        # Reading, or content exists and isn't to be overwritten
+        if read_only is True or (read_only is None and content): return content or value
+        lines.write(value) # Otherwise, content is default value
+        return value if read_only is None else True
+
+    # If a key is specified (looking for a line)
+    index = keys[0]
+    if index < 0: index += lines.count() # Negative indices count from the end
+    line = lines.line(index) if index >= 0 else None
+    if line is None: # If doesn't exist
+        # False means we want to raise IndexError
+        if keynotfound is False: raise IndexError(f"Index {keys[0]} is out of range")
+        # None means we ignore and return early
+        elif keynotfound is None or index < 0: return False if read_only is False else value
+        # Otherwise, the file is extended to contain the value
+        elif read_only is True: return value # No writing to do ; return default
+    elif read_only is True: return line
+    elif read_only is None and line: return line # Only written if empty
+    # Write to file (checked again, in case it changed meanwhile)
+    out = lines.set(index, value, empty_only = read_only is None)
     return out if read_only is None else True
 
 
@@ -225,18 +825,256 @@ def data_json(path: str, value = None, *keys, read_only: bool = True,
     """
     Data function to read and write from/to .json files
     See data() for more information on function parameters
+    The parsed file is cached in memory (see Document),
+    so reads cost a lookup and writes are flushed in batches
     """
-    # Read the file data and parse it from json to a python structure
-    with open(path, 'r', encoding="utf-8") as F: content = load(F)
-    if not keys: # No keys provided (want the whole object)
-        if not content: content = value # Default content is given value
-        out = content # Output is content as a whole
-    # Otherwise : output is recursive file exploration result
-    else: out = explore_struct(content, value, *keys, read_only = read_only, keynotfound = keynotfound)
-    if read_only is True: return out # No writing ; return output
-    # Write to file as a json-formatted text
-    with open(path, "w", encoding="utf-8") as F: dump(content, F, indent=4)
-    return out if read_only is None else True
+    document = get_document(path)
+    with document.lock:
+        content = document.content
+        if not keys: # No keys provided (want the whole object)
+            if read_only is True: return detach(content) if content else value
+            # Default content is given value
+            if read_only is False or not content:
+                document.write(detach(value))
+            return detach(document.content) if read_only is None else True
+
+        if read_only is True: # Missing keys are never created on a read
+            return detach(explore_struct(content, value, *keys, read_only = True,
+                keynotfound = False if keynotfound is False else None))
+        if read_only is None: # Only write if the value doesn't exist yet
+            out = explore_struct(content, _MISSING, *keys, read_only = True, keynotfound = None)
+            if out is not _MISSING: return detach(out)
+
+        # Key is missing and should not be created
+        if keynotfound is not True and explore_struct(content, _MISSING, *keys,
+            read_only = True, keynotfound = keynotfound) is _MISSING:
+                return value if read_only is None else False
+        # Otherwise, write the value (creating missing keys)
+        document.write(detach(value), *keys, read_only = read_only)
+        return detach(value) if read_only is None else True
+
+
+
+##################################################
+# ACCESSORS
+##################################################
+
+
+
+class Accessor:
+    """
+    Path to a value of a json source, checked once and reused:
+    prefix = accessor("Data/servers.json", guild_id, "bots", bot_id, "prefix")
+    get(), set() and setdefault() then walk the cached document key by key,
+    and get_many() reads several subpaths under a single lookup.
+    Sharded sources are resolved to the file of their first key.
+    """
+    def __init__(self, source: str, *keys: str|int) -> None:
+        self.check(source, keys)
+        if source in _BACKENDS:
+            if not keys: raise IndexError(f"Must provide the first key of sharded {source}")
+            _BACKENDS[source].load()
+            source = _BACKENDS[source].shard(keys[0]) ; keys = keys[1:]
+        elif not source.endswith(".json"): raise ValueError(f"Cannot access json path in {source}")
+        self.source = source
+        self.path = path_from_root(source)
+        self.keys = keys
+
+
+    def __repr__(self) -> str:
+        return f"Accessor({self.source!r}, {', '.join(map(repr, self.keys))})"
+
+
+    def document(self, create: bool = False) -> Document|None:
+        """Cached document of the source, None if the file is missing (and not created)."""
+        if not os_path.isfile(self.path):
+            if not create: return None
+            ensure_file(self.source, _DATA_FORMATS["json"], False, True)
+        return get_document(self.path)
+
+
+    @staticmethod
+    def check(source: str, keys: tuple) -> None:
+        """Raise TypeError if a key is neither a str (dict key) nor an int (list index)."""
+        for key in keys: # bool is an int, but never a valid index
+            if type(key) not in (str, int): raise TypeError(f"Cannot use {key!r} as a key of {source}")
+
+
+    @staticmethod
+    def find(content: any, keys: tuple) -> any:
+        """Value at keys in content, _MISSING if any key is absent."""
+        for key in keys:
+            if type(key) is str:
+                if not isinstance(content, dict) or key not in content: return _MISSING
+            elif not isinstance(content, list) or not 0 <= key < len(content): return _MISSING
+            content = content[key]
+        return content
+
+
+    def get(self, default = None) -> any:
+        """Value at the path (a detached copy), default if missing."""
+        document = self.document()
+        if document is None: return default
+        with document.lock: out = self.find(document.content, self.keys)
+        return default if out is _MISSING else detach(out)
+
+
+    def get_many(self, *paths: tuple, default = None) -> list:
+        """Values at each subpath (tuple of keys below the path), default if missing."""
+        for keys in paths: self.check(self.source, keys)
+        document = self.document()
+        if document is None: return [default for _ in paths]
+        with document.lock:
+            base = self.find(document.content, self.keys)
+            out = [self.find(base, keys) for keys in paths]
+        return [default if o is _MISSING else detach(o) for o in out]
+
+
+    def set(self, value) -> None:
+        """Write the value at the path, creating missing keys."""
+        self.put(detach(value), read_only = False)
+
+
+    def setdefault(self, value) -> any:
+        """Value at the path, after writing the given one there if it was missing."""
+        document = self.document(create = True)
+        with document.lock:
+            out = self.find(document.content, self.keys)
+            if out is not _MISSING: return detach(out)
+            value = detach(value) ; self.put(value, read_only = None)
+        return detach(value)
+
+
+    def put(self, value, read_only: bool|None) -> None:
+        """Write into the document, in place when the parent of the value exists."""
+        document = self.document(create = True)
+        with document.lock:
+            if not self.keys: return document.write(value, read_only = read_only)
+            parent, key = self.find(document.content, self.keys[:-1]), self.keys[-1]
+            if (isinstance(parent, dict) and type(key) is str
+                or isinstance(parent, list) and 0 <= key < len(parent)):
+                parent[key] = value
+                document.record(value, *self.keys, read_only = read_only)
+            else: document.write(value, *self.keys, read_only = read_only) # Creates the parents
+
+
+def accessor(source: str, *keys: str|int) -> Accessor:
+    """Return the Accessor of a json path (see data() for source and keys)."""
+    return Accessor(source, *keys)
+
+
+@contextmanager
+def transaction(source: str, *keys: str|int):
+    """
+    Batch several changes to a json object (at keys, {} if missing) into one write:
+    with transaction("Data/servers.json", guild_id, "inventory") as inventory: ...
+    The block works on a copy, written back on exit only if it changed,
+    and dropped if an exception is raised (nothing was written).
+    Other threads cannot modify the document during the block.
+    """
+    path = Accessor(source, *keys)
+    document = path.document(create = True)
+    with document.lock:
+        before = begin(path, document)
+        content = detach(before)
+        yield content
+        commit(path, document, before, content)
+
+
+def begin(path: Accessor, document: Document) -> dict|list:
+    """Copy of the object a transaction works on."""
+    with document.lock: found = path.find(document.content, path.keys)
+    if found is _MISSING: return {}
+    if not isinstance(found, (dict, list)): raise TypeError(f"Cannot start a transaction on {found!r} ({path})")
+    return detach(found)
+
+
+def changes(before: any, after: any, keys: tuple = ()) -> list[tuple]:
+    """
+    Writes turning before into after, as (keys, value), _MISSING removing the key.
+    Objects are compared key by key, other values (lists included) are replaced whole.
+    """
+    if not isinstance(before, dict) or not isinstance(after, dict):
+        return [] if before == after else [(keys, after)]
+    ops = [(keys + (key,), _MISSING) for key in before if key not in after]
+    for key, value in after.items():
+        if key not in before: ops.append((keys + (key,), value))
+        else: ops += changes(before[key], value, keys + (key,))
+    return ops
+
+
+def commit(path: Accessor, document: Document, before: dict|list, content: dict|list) -> None:
+    """
+    Write what a transaction changed, key by key: replayed over a newer version of the file
+    (written by another process), the changes it made to other keys are kept.
+    """
+    with document.lock:
+        for keys, value in changes(before, content):
+            document.write(detach(value), *path.keys, *keys)
+
+
+
+##################################################
+# ASYNC
+##################################################
+
+
+
+_EXECUTOR = ThreadPoolExecutor(max_workers = 4, thread_name_prefix = "data")
+_LOADING = {} # Absolute path -> Future of the load in progress
+
+
+def data_path(source: str, *keys) -> str|None:
+    """Return the absolute path of the file data(source, *keys) uses (None if several)."""
+    if source not in _BACKENDS: return path_from_root(source)
+    if not keys or not _BACKENDS[source].migrated: return None
+    return path_from_root(_BACKENDS[source].shard(keys[0]))
+
+
+def preload(path: str) -> None:
+    """Load (or refresh) the cached document of a json file, if it exists."""
+    if os_path.isfile(path): get_document(path)
+
+
+async def load_document(path: str) -> None:
+    """Run preload() in the thread pool. Concurrent calls for a path share one load."""
+    future = _LOADING.get(path)
+    if future is None:
+        future = _LOADING[path] = get_running_loop().run_in_executor(_EXECUTOR, preload, path)
+        future.add_done_callback(lambda f: _LOADING.pop(path, None))
+    await future
+
+
+async def adata(source: str, value = None, *keys, **kwargs) -> any:
+    """
+    Coroutine version of data(), with the same parameters and behavior.
+    File reads run in a dedicated thread pool instead of the event loop.
+    Json documents are loaded there first, then accessed from the cache
+    (writes are flushed by a thread too), anything else runs in the pool.
+    """
+    path = data_path(source, *keys)
+    if path is None or not path.endswith(".json"):
+        return await get_running_loop().run_in_executor(_EXECUTOR,
+            partial(data, source, value, *keys, **kwargs))
+    await load_document(path)
+    return data(source, value, *keys, **kwargs)
+
+
+@asynccontextmanager
+async def atransaction(source: str, *keys: str|int):
+    """
+    Async version of transaction(), holding data_lock(source) instead of the
+    document lock, as the block can await: every coroutine modifying the source
+    should hold that lock too (or use atransaction()).
+    """
+    async with data_lock(source):
+        path = await get_running_loop().run_in_executor(_EXECUTOR, partial(Accessor, source, *keys))
+        await load_document(path.path)
+        document = path.document(create = True)
+        before = begin(path, document)
+        content = detach(before)
+        yield content
+        commit(path, document, before, content)
 
 
 
@@ -247,4 +1085,7 @@ def data_json(path: str, value = None, *keys, read_only: bool = True,
 
 
 if __name__ == "__main__":
-    pass
\ No newline at end of file
+    from sys import argv
+    # python -m Modules.data migrate <source>
+    if len(argv) == 3 and argv[1] == "migrate":
+        print(f"Migrated {migrate(argv[2]) or 0} keys from '{argv[2]}'")
\ No newline at end of file
@@ -17,6 +17,7 @@ from random import choices, randint
 from Modules.logic import is_num, _REPLACE, replace_simple
 from Modules.logic import _AFTER_STR, resolve, noresolve_stack
 from Modules.logic import analyse, check_for_func
+from Modules.logic import _VECTORS, _VECTOR_BOUND, Call, constant, vectorize
 from Modules.basic import isiterable, surround
 
 
@@ -129,6 +130,23 @@ SOURCE = {
 }
 
 
+def vector_anyroll(generator, size: int, source: dict, expr: Call = None,
+        x: Call = None, r: Call = None, rr: Call = None) -> any:
+    """size rolls at once (numpy), for plain rolls only: no explode or reroll."""
+    if not all(i is None or isinstance(i, Call) and i.name == "nonehold" for i in (x, r, rr)): return None
+    if not isinstance(expr, Call) or source.get(expr.name) is not roll or len(expr.args) != 1: return None
+    sides = constant(expr.args[0])
+    if sides is None or abs(sides) >= _VECTOR_BOUND: return None
+    if sides == 0: return vectorize(expr.args[0], generator, size, source) # d0 = [0]
+    # Same faces as roll()
+    (sides, m) = (sides, 1) if sides > 0 else (-sides, -1)
+    if sides == 1: return generator.integers(0, 2, size) * m
+    return generator.integers(1, sides + 1, size) * m
+
+
+_VECTORS[anyroll] = vector_anyroll
+
+
 ##################################################
 # SCUFF
 ##################################################
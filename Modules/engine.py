@@ -0,0 +1,141 @@
+"""
+Evaluation of math and dice expressions, in the calling thread or in worker processes.
+Worker processes keep CPU heavy expressions away from the bot process (and its GIL):
+they are started in advance with the logic tables loaded, and killed on timeout.
+"""
+
+
+
+##################################################
+# IMPORTS
+##################################################
+
+
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from asyncio import get_running_loop, wait_for, to_thread, TimeoutError
+
+from Modules.logic import main as main_math
+from Modules.logic import noresolve_stack, Numbers
+from Modules.dice import SOURCE, scuff, translate_dice
+
+
+
+##################################################
+# SOLVER
+##################################################
+
+
+
+def solver(expr: str, stack: list, start: float, dice: bool = False,
+        is_scuff: bool = False, noresolve: bool = False, numbers: Numbers = None) -> (any, bool):
+    """Evaluate an expression (translating its dice first if asked), with floats or numbers."""
+    if dice:
+        expr, had_dice = translate_dice(expr, is_scuff, stack if noresolve else None)
+        if had_dice:
+            noresolve_stack(stack, expr, "Translated", noresolve)
+            source = SOURCE.copy() if dice else {}
+            if is_scuff: source["scuff"] = scuff
+        else: source = None
+    else:
+        had_dice = False ; source = None
+    result = main_math(expr, stack, source, start, noresolve, numbers)[0]
+    return result, had_dice
+
+
+def process_solver(expr: str, stack: list, *args) -> (any, bool, list):
+    """solver() in a worker process, also returning the stack as it is not shared."""
+    result, had_dice = solver(expr, stack, *args)
+    return result, had_dice, stack
+
+
+def warm() -> None:
+    """Initializer of worker processes: load the logic tables and run a first evaluation."""
+    solver("1d20+1", [], None, True)
+
+
+
+##################################################
+# POOL
+##################################################
+
+
+
+class EvaluationPool:
+    """
+    Worker processes evaluating expressions, started in advance.
+    An evaluation running past its timeout has its workers killed
+    (evaluations they were running are retried once on the new ones).
+    """
+    def __init__(self, workers: int = 2) -> None:
+        self.workers = workers
+        self.executor = None
+        self.start()
+
+
+    def start(self) -> None:
+        """Start new workers (spawned now rather than on first use)."""
+        self.executor = ProcessPoolExecutor(self.workers, get_context("spawn"), initializer = warm)
+        for _ in range(self.workers): self.executor.submit(int)
+
+
+    async def run(self, timeout: float, func: callable, *args, retry: bool = True) -> any:
+        """Run func(*args) in a worker, raise TimeoutError (and kill it) past timeout."""
+        executor = self.executor
+        try: return await wait_for(get_running_loop().run_in_executor(executor, func, *args), timeout)
+        except TimeoutError:
+            self.kill(executor) ; raise
+        except BrokenProcessPool: # Killed because of another evaluation
+            if not retry: raise
+            self.kill(executor)
+            return await self.run(timeout, func, *args, retry = False)
+
+
+    def kill(self, executor: ProcessPoolExecutor) -> None:
+        """Kill the processes of an executor and replace it (if it still is the current one)."""
+        if executor is not self.executor: return
+        self.start()
+        for process in list((executor._processes or {}).values()): process.kill()
+        executor.shutdown(wait = False, cancel_futures = True)
+
+
+    def shutdown(self) -> None:
+        """Stop the workers."""
+        self.executor.shutdown(wait = False, cancel_futures = True)
+
+
+
+##################################################
+# FUNCTIONS
+##################################################
+
+
+
+async def evaluate(bot, timeout: float, expr: str, stack: list, start: float, dice: bool = False,
+        is_scuff: bool = False, noresolve: bool = False) -> (any, bool):
+    """
+    solver() through the worker processes of the bot if it has some (bot.evaluator),
+    in a thread otherwise, with the numbers of the bot (bot.numbers, floats if None).
+    Raise TimeoutError past timeout.
+    """
+    pool: EvaluationPool = getattr(bot, "evaluator", None)
+    numbers: Numbers = getattr(bot, "numbers", None)
+    if pool is None: return await wait_for(to_thread(solver,
+        expr, stack, start, dice, is_scuff, noresolve, numbers), timeout)
+    result, had_dice, new_stack = await pool.run(timeout, process_solver,
+        expr, stack, start, dice, is_scuff, noresolve, numbers)
+    stack[:] = new_stack # Steps and values of the worker
+    return result, had_dice
+
+
+
+##################################################
+# MAIN
+##################################################
+
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,108 @@
+"""
+Typed settings of a bot in each guild ("Data/servers.json": guild / "bots" / bot),
+loaded once per guild with their defaults, and written back field by field.
+"""
+
+
+
+##################################################
+# IMPORTS
+##################################################
+
+
+
+from discord.ext.commands.bot import Bot
+
+from Modules.store import bot_data
+
+
+
+##################################################
+# SETTINGS
+##################################################
+
+
+
+class BotSettings:
+    """
+    Settings of the bot in a guild, as attributes.
+    Missing fields get their default when loaded, not on each access.
+    Assigning a field marks it as modified until save() writes it back.
+    """
+    __slots__ = ("bot", "guild_id", "prefix", "volume", "looping", "_dirty")
+    FIELDS = ("prefix", "volume", "looping")
+
+    def __init__(self, bot: Bot, guild_id: str, content: dict = None) -> None:
+        content = content or {}
+        defaults = {"prefix": bot.prefix, "volume": 100, "looping": False}
+        object.__setattr__(self, "bot", bot)
+        object.__setattr__(self, "guild_id", guild_id)
+        object.__setattr__(self, "_dirty", set())
+        for name in self.FIELDS: object.__setattr__(self, name, content.get(name, defaults[name]))
+
+
+    def __setattr__(self, name: str, value) -> None:
+        object.__setattr__(self, name, value)
+        if name in self.FIELDS: self._dirty.add(name)
+
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"BotSettings(guild={self.guild_id}, {fields})"
+
+
+    @property
+    def dirty(self) -> bool:
+        """Whether some fields were modified since loaded or saved."""
+        return bool(self._dirty)
+
+
+    async def save(self) -> None:
+        """Write the modified fields back to the guild data."""
+        dirty = self._dirty ; object.__setattr__(self, "_dirty", set())
+        try:
+            for name in dirty: await bot_data(self.bot, "Data/servers.json", getattr(self, name),
+                self.guild_id, "bots", str(self.bot.user.id), name, read_only = False)
+        except BaseException: # Still to be written
+            self._dirty.update(dirty) ; raise
+
+
+
+##################################################
+# FUNCTIONS
+##################################################
+
+
+
+_SETTINGS = {} # (bot id, guild id) -> BotSettings
+
+
+async def guild_settings(bot: Bot, guild_id: int|str) -> BotSettings:
+    """
+    Settings of the bot in a guild, loaded on first use then kept in memory.
+    Only this bot writes them, so they cannot change behind its back.
+    """
+    key = (bot.user.id, str(guild_id))
+    settings = _SETTINGS.get(key)
+    if settings is None:
+        content = await bot_data(bot, "Data/servers.json", {}, str(guild_id), "bots",
+            str(bot.user.id), filenotfound = None, keynotfound = None)
+        # Another command may have loaded them meanwhile
+        settings = _SETTINGS.setdefault(key, BotSettings(bot, str(guild_id), content))
+    return settings
+
+
+def discard_settings(bot: Bot, guild_id: int|str) -> None:
+    """Forget the settings of a guild (after its data was removed)."""
+    _SETTINGS.pop((bot.user.id, str(guild_id)), None)
+
+
+
+##################################################
+# MAIN
+##################################################
+
+
+
+if __name__ == "__main__":
+    pass
@@ -129,7 +129,7 @@ async def log_error(ctx: CTX, logs: dict, msg: str) -> None:
         # If no error log channel, notify in current channel
         return await Reactech(ctx.bot).reactech_channel(
             ctx, "⚠️", "An error occurred, but no error log channel is set.\n" +
-            f"Use `{get_prefix(ctx)[0]}manage_inventory log error <channel>` to set one up." # TODO:
+            f"Use `{(await get_prefix(ctx))[0]}manage_inventory log error <channel>` to set one up." # TODO:
         )
     embed = log_create_embed(ctx, "error", "Inventory: System Error", msg, ctx.bot.user)
     embed.set_footer(text=f"Created by command '{ctx.command.name}' in #{ctx.channel.name}")
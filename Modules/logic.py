@@ -12,9 +12,19 @@ Logic module for calculation, randomness, and boolean operations.
 
 from asyncio import TimeoutError
 from time import time
-from Modules.data import data
+from functools import lru_cache, partial
+from collections import OrderedDict
+from threading import Lock
+from fractions import Fraction
+from decimal import Decimal, Context, localcontext
+from contextlib import nullcontext
+from heapq import nlargest, nsmallest
+from types import GeneratorType
+from Modules.resources import resource_json
 from Modules.basic import isiterable, flatten
 import math, random
+try: import numpy # Optional, vectorized iterations
+except ImportError: numpy = None
 
 
 
@@ -25,6 +35,15 @@ import math, random
 
 
 _ARG_TIMEOUT = 5
+_CACHE_SIZE = 256 # Expressions (and deterministic results) kept in memory
+_CACHE_ITEMS = 64 # Longest list result (or extracted values) kept in memory
+_STEPS = 10**7 # Function calls and loop iterations an evaluation may spend
+_MAX_DIGITS = 4300 # Longest integer an evaluation may produce (longer ones cannot be printed)
+_MAX_BITS = _MAX_DIGITS * math.log2(10)
+_VECTOR_MIN = 64 # Iterations from which samples are generated at once (with numpy)
+_VECTOR_MAX = 10**7 # Most values generated at once
+_VECTOR_BOUND = 2**62 # Magnitude int64 vectors must stay under (they overflow silently)
+_VECTORS = {} # Function -> vectorized version, vector(generator, size, source, *args)
 
 
 # numbers (as str) 0-9 (because '²'.isdigit() return True)
@@ -32,10 +51,9 @@ def nums() -> str: return "".join([str(n) for n in range(10)])
 # is numerical or part of decimal point
 def is_num(txt: str): return all([c in nums() or c == "." for c in txt])
 
-def symb_comma() -> set: return set(_SYMBOLS.keys()).union({","})
 
 
-_LOGIC_FUNC = data("Resources/Files/Evaluation/logic.json", filenotfound = False)
+_LOGIC_FUNC = resource_json("Evaluation/logic.json")
 _SYMBOLS = {} ; _NAMES = {}
 _MID = [{} for i in "x"*6]
 _AFTER = {} ; _NO_RESOLVE = set()
@@ -58,6 +76,12 @@ _REPLACE = {
 
 _ALLOW = set("abcdefghijklmnopqrstuvwxyzπτ()[]{},.?")
 _ALLOW = _ALLOW.union(nums())
+_NUMERIC = frozenset(nums() + ".")
+
+# Lookup tables built from the above, so expressions are read in one scan
+_ALIASES = {} # Alias (or name) -> primary name
+_CONSTANT_NAMES = {} # Constant name -> function holding its value
+_SYMBOL_TRIE = {} # Symbols char by char, '' holding the top-level symbol ending there
 
 
 def set_globals() -> None:
@@ -82,9 +106,28 @@ def set_globals() -> None:
             if len(value["symbols"]) > 1: # 'low-level' symbols as dict values
                 _SYMBOLS[value["symbols"][0]] = value["symbols"][1:]
 
+    # Reverse lookups (the first declared wins, like a scan in declaration order)
+    for key, value in _NAMES.items():
+        for alias in value: _ALIASES.setdefault(alias, key)
+    for key, value in _CONSTANTS.items():
+        for name in value: _CONSTANT_NAMES.setdefault(name, key.removesuffix("()"))
+    for key, value in _SYMBOLS.items():
+        for symbol in (key, *value):
+            node = _SYMBOL_TRIE
+            for char in symbol: node = node.setdefault(char, {})
+            node.setdefault("", key)
+
 set_globals()
 
 _AFTER_STR = "".join(_AFTER.keys())
+# Binding power of 'mid' symbols, in the order they apply (by priority, then logic.json order)
+_ORDER = [symbol for priority in _MID for symbol in priority]
+_BINDING = {symbol: len(_ORDER) - i for i, symbol in enumerate(_ORDER)}
+_INFIX = {symbol: func for priority in _MID for symbol, func in priority.items()}
+# Functions whose result changes between calls (never cached)
+_RANDOM = {k for k, v in _LOGIC_FUNC.items() if v["origin"] == "random"}
+# Functions giving the same result for the same arguments, without side effects
+_PURE = {k for k, v in _LOGIC_FUNC.items() if v.get("pure", True)}
 _TYPES = {"comma", "other", "symbol", "num", "alpha", "par", "func"} # Analysis types
 
 
@@ -214,166 +257,212 @@ def replace_simple(txt: str, source: dict) -> str:
     return txt
 
 
-def replace_targeted(txt: str, source: dict, func: bool) -> str:
-    """
-    Replace elements of value by key
-    Unlike replace_simple, this works by checking along the txt
-    and dynamically replacing the whole element using analysis
-    """
-    index = 0
-    while index < len(txt):
-        # Here, we analyse the txt to gather info
-        section = analyse(txt, index)
-        for key, value in source.items():
-            if section.content in value: # if analysis substring is an alias
-                replace = str(key) # We also need implicit multiplication
-                # Otherwise, 2pi --> 23.14159 and not 2*3.14159
-                if section.start > 0 and \
-                    (is_num(txt[section.start - 1]) or \
-                    txt[section.start - 1] == ")" or \
-                    txt[section.start - 1] in _AFTER_STR):
-                        replace = "*" + replace
-                if section.end < len(txt) - 2 and \
-                    (is_num(txt[section.end + 1]) or \
-                    (txt[section.end + 1] == "(" and func) or \
-                    txt[section.end + 1].isalpha()):
-                        replace = replace + "*"
-                txt = txt[:section.start] + replace + txt[section.end + 1:]
-        if section.type == "par": index += 1
-        # We can skip the whole section if it doesn't nest
-        else: index = section.end + 1
-    return txt
-        
-
-
-##################################################
-# IMPLICIT OPERATIONS
-##################################################
+def match_symbol(txt: str, i: int) -> tuple[str, int]|None:
+    """Longest symbol starting at txt[i], as (top-level symbol, length), if any."""
+    node = _SYMBOL_TRIE ; found = None ; j = i
+    while j < len(txt) and txt[j] in node:
+        node = node[txt[j]] ; j += 1
+        if "" in node: found = (node[""], j - i)
+    return found
 
 
+def canonical_name(name: str) -> str:
+    """Primary name of a function alias (the name itself if it is not an alias)."""
+    return _ALIASES.get(name, name)
 
-def implicit_multiplication(txt: str) -> str:
-    """Place asterixes on implicit multiplication."""
-    index = 0
-    while index < len(txt):
-        section = analyse(txt, index)
-        # We check the 'after', then the 'before'
-        # So that txt indices don't move too much
-        if section.type not in ["symbol", "comma"]:
-            # IF it's not at the end AND not before ')'
-            # AND not before a top-level symbol or ','
-            # AND is not between function name and '('
-            if section.end != len(txt)-1 and \
-                txt[section.end + 1] != ")" and \
-                txt[section.end + 1] not in symb_comma() and \
-                (section.type != "alpha" or txt[section.end + 1] != "("):
-                    # Insert a '*' after the current section
-                    txt = txt[:section.end+1] + "*" + txt[section.end + 1:]
-            # IF it's not at the start AND not after '('
-            # AND not before a top-level symbol or ','
-            # AND is not between function name and '('
-            if section.start != 0 and \
-                txt[section.start - 1] != "(" and \
-                (txt[section.start - 1] not in symb_comma() or \
-                 txt[section.start - 1] in _AFTER_STR) and \
-                (section.type != "par" or not txt[section.start - 1].isalpha()):
-                    # Insert a '*' before the current section
-                    txt = txt[:section.start] + "*" + txt[section.start:]
-        if section.type == "par": index += 1
-        # We can skip the whole section if it doesn't nest
-        else: index += section.end - section.start + 1
-    return txt
 
-
-def implicit_zero(txt: str) -> str:
-    """Place zero before vacant '-' or '+', or before/after vacant '.'"""
-    index = 0
-    while True: # Decimal point
-        index = txt.find('.', index)
-        if index == -1: break
-        # Check after then before to avoid moving indices
-        if index == len(txt) - 1 or \
-            txt[index+1] not in nums() :
-                # 123. --> 123.0
-                txt = txt[:index] + '.0' + txt[index+1:]
-        if index == 0 or \
-            txt[index-1] not in nums():
-                # .123 --> 0.123
-                txt = txt[:index] + '0.' + txt[index+1:]
-        index += 1
-
-    for symbol in ['+', '-']:
-        index = 0
-        while True: # Find standalone '+' and '-'
-            index = txt.find(symbol, index)
-            if index == -1: break
-            # If at the end or followed by '(': Syntax error to avoid loop/range error
-            if index == len(txt) - 1 or txt[index+1] == ')':
-                raise SyntaxError(f"Symbol '{symbol}' was misplaced")
-            # If at the start or not preceded by a valid argument
-            if index == 0 or txt[index-1] not in nums() + ')' + _AFTER_STR:
-                # Encapsulate the symbol and the 'after' argument
-                section = check_for_func(txt, analyse(txt, index + 1))
-                # Inside parentheses
-                txt = txt[:index] + '(0' + symbol + section.content + ')' + txt[section.end+1:]
-            index += 1
-    return txt
+def constant_function(name: str) -> str|None:
+    """Function holding the value of a constant name ('pi' -> 'pihold'), if it is one."""
+    return _CONSTANT_NAMES.get(name)
 
 
 
 ##################################################
-# FUNCTION PLACEMENT
+# TOKENIZER
 ##################################################
 
 
 
-def place_functions(txt: str) -> str:
-    """Replace symbols by their function."""
-    for key, value in _AFTER.items():
-            txt = place_after(txt, key, value)
-    for priority in range(6): # Order by priority above all
-        for key, value in _MID[priority].items():
-            txt = place_mid(txt, key, value)
-    return txt
+def tokenize(txt: str) -> list[tuple[str, str]]:
+    """
+    Split a sanitized expression into (type, content) tokens in a single pass.
+    Types are 'num', 'name', 'symbol' (as its top-level symbol), '(', ')' and ','.
+    """
+    tokens = [] ; i = 0 ; end = len(txt)
+    while i < end:
+        char = txt[i]
+        if char in "(),": tokens.append((char, char)) ; i += 1
+        elif char in "πτ?": tokens.append(("name", char)) ; i += 1
+        elif char in _NUMERIC: # Digits and decimal points
+            j = i + 1
+            while j < end and txt[j] in _NUMERIC: j += 1
+            tokens.append(("num", txt[i:j])) ; i = j
+        elif char.isalpha():
+            j = i + 1
+            while j < end and txt[j].isalpha() and txt[j] not in "πτ": j += 1
+            tokens.append(("name", txt[i:j])) ; i = j
+        else: # Longest symbol starting here
+            found = match_symbol(txt, i)
+            if found is None: raise ValueError(f"What is '{char}' at index {i} ?")
+            tokens.append(("symbol", found[0])) ; i += found[1]
+    return tokens
 
 
-def place_after(txt: str, symbol: str, func: str) -> str:
-    """Replace symbol by its function, affecting the previous term."""
-    while symbol in txt:
-        # From first to last
-        index = txt.find(symbol) ; cursor = index ; content = ""
-        while True: # section.start-1 is always out of section.content, so this will end
-            if cursor <= 0 or txt[cursor-1] == "(": # even if it ends here
-                raise SyntaxError(f"Symbol '{symbol}' was misplaced")
-            # Next batch of string to process
-            section = check_for_func(txt, analyse(txt, cursor - 1)) # Forced backwards
-            content = section.content + content # Concatenate content
-            # Only 'par','func' and 'num' can be affected by an 'AFTER' symbol
-            if section.type in {"par", "func", "num"}: break
-            cursor = section.start # Loop again, find the earliest affected element
-        # (10/3)~! --> factorial(round(10/3))
-        txt = txt[:section.start] + func + "(" + content + ")" + txt[index+1:]
-    return txt
 
+##################################################
+# PARSER
+##################################################
 
-def place_mid(txt: str, symbol: str, func: str) -> str:
-    """Replace symbol by its function, affecting the previous and next term."""
-    while symbol in txt:
-        index = txt.index(symbol)
-        # If symbol at start or end
-        # OR not preceded by a valid argument
-        # OR not followed by a valid argument
-        if index == 0 or index >= len(txt) - 1 or \
-            txt[index-1] not in nums() + ")" + _AFTER_STR or not \
-            (txt[index+1] in nums() + "(+-" or txt[index+1].isalpha()):
-                raise SyntaxError(f"Symbol '{symbol}' was misplaced")
-        # Need to ensure we get the whole functions if any are
-        section1 = check_for_func(txt, analyse(txt, index - 1))
-        section2 = check_for_func(txt, analyse(txt, index + 1))
-        # func(1+1)^func(2+2) --> pow(func(1+1),func(2+2))
-        txt = txt[:section1.start] + func + "(" + section1.content + \
-            "," + section2.content + ")" + txt[section2.end + 1:]
-    return txt
+
+
+class Node:
+    """
+    Element of a parsed expression, resolved by resolve().
+    pure: whether it only calls pure functions (its result can be reused).
+    reused: whether it may be resolved several times in an evaluation.
+    """
+    __slots__ = ("_code", "_stream", "pure", "reused")
+
+    def compiled(self, streamed: bool = False) -> callable:
+        """
+        Closure resolving the node, code(stack, source, budget), built on first use.
+        Streamed (read by a function consuming it as a stream), it may give a lazy sequence.
+        """
+        try: return self._stream if streamed else self._code
+        except AttributeError:
+            code = compile_node(self, streamed)
+            if streamed: self._stream = code
+            else: self._code = code
+            return code
+
+
+class Num(Node):
+    """Numeric literal (with its text, for exact numeric modes)."""
+    __slots__ = ("value", "text")
+    def __init__(self, value: int|float, text: str = None) -> None:
+        self.value = value ; self.text = str(value) if text is None else text
+        self.pure = True ; self.reused = False
+    def __str__(self) -> str: return str(self.value)
+
+
+class Call(Node):
+    """Function call, with its (unresolved) arguments."""
+    __slots__ = ("name", "args")
+    def __init__(self, name: str, args: list) -> None:
+        self.name = name ; self.args = tuple(args)
+        self.pure = name in _PURE and all(arg.pure for arg in self.args) ; self.reused = False
+    def __str__(self) -> str: return f"{self.name}({','.join(map(str, self.args))})"
+
+
+class Seq(Node):
+    """Comma separated values between parentheses, resolved as a list."""
+    __slots__ = ("items",)
+    def __init__(self, items: list) -> None:
+        self.items = tuple(items) ; self.reused = False
+        self.pure = all(item.pure for item in self.items)
+    def __str__(self) -> str: return f"({','.join(map(str, self.items))})"
+
+
+class Parser:
+    """
+    Pratt parser building the tree of an expression from its tokens.
+    'after' symbols apply to the term before them, before anything else.
+    'mid' symbols bind by priority, then by logic.json order within a priority
+    (so 8*3:2 is mul(8,intdiv(3,2)), as their functions were always placed),
+    and are left associative. Terms next to each other are multiplied.
+    A '-' or '+' without a term before it only applies to the next term: -2^2 = (0-2)^2.
+    """
+    def __init__(self, tokens: list[tuple[str, str]]) -> None:
+        self.tokens = tokens ; self.index = 0
+
+
+    def peek(self) -> tuple[str, str]|None:
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+
+    def parse(self) -> Node:
+        """Tree of the whole expression (a Seq if it has top-level commas)."""
+        items = self.arguments(None)
+        return items[0] if len(items) == 1 else Seq(items)
+
+
+    def arguments(self, closing: str|None) -> list[Node]:
+        """Comma separated expressions up to the closing token (empty ones are dropped)."""
+        items = []
+        while True:
+            token = self.peek()
+            if token is None or token[0] == ")":
+                if token is not None: self.index += 1
+                if (token is None) != (closing is None): raise SyntaxError("Parentheses are not balanced")
+                return items
+            if token[0] == ",": self.index += 1
+            else: items.append(self.expression())
+
+
+    def expression(self, binding: int = 0) -> Node:
+        """Expression made of the terms and symbols binding stronger than binding."""
+        left = self.term()
+        while True:
+            token = self.peek()
+            if token is None or token[0] in "),": return left
+            kind, content = token
+            if kind == "symbol" and content in _AFTER:
+                self.index += 1 ; left = Call(_AFTER[content], [left])
+                continue
+            if kind == "symbol":
+                if content not in _BINDING: raise SyntaxError(f"Symbol '{content}' was misplaced")
+                power, func = _BINDING[content], _INFIX[content]
+            else: power, func = _BINDING["*"], _INFIX["*"] # Implicit multiplication
+            if power < binding: return left
+            if kind == "symbol":
+                self.index += 1
+                following = self.peek()
+                if following is None or following[0] in "),": raise SyntaxError(f"Symbol '{content}' was misplaced")
+            left = Call(func, [left, self.expression(power + 1)])
+
+
+    def term(self) -> Node:
+        """Single term: number, constant, function call, parentheses or signed term."""
+        token = self.peek()
+        if token is None or token[0] in "),": raise SyntaxError("An expression is missing")
+        kind, content = token ; self.index += 1
+        if kind == "num": # Implicit 0 in _.123 and 123._
+            if content == ".": return Num(0.0, "0")
+            return Num(float(content), content) if "." in content else Num(int(content), content)
+        if kind == "(":
+            items = self.arguments(")")
+            return items[0] if len(items) == 1 else Seq(items)
+        if kind == "name":
+            constant = constant_function(content)
+            if constant: return Call(constant, [])
+            following = self.peek()
+            if following is None or following[0] != "(": return Call(canonical_name(content), [])
+            self.index += 1
+            return Call(canonical_name(content), self.arguments(")"))
+        if content in "+-": # Implicit 0 in _-1 or _+1
+            following = self.peek()
+            if following is None or following[0] in "),": raise SyntaxError(f"Symbol '{content}' was misplaced")
+            return Call(_INFIX[content], [Num(0), self.term()])
+        raise SyntaxError(f"Symbol '{content}' was misplaced")
+
+
+def intern(node: Node, table: dict, repeated: bool = False) -> Node:
+    """
+    Same node for identical subtrees of an expression (hash-consing),
+    so that a pure subtree written several times is resolved once.
+    Nodes found twice, or in arguments resolved by their function (iterations), are reused.
+    """
+    if isinstance(node, Num): key = ("num", type(node.value), node.value, node.text)
+    elif isinstance(node, Seq):
+        node.items = tuple(intern(item, table, repeated) for item in node.items)
+        key = ("seq", *map(id, node.items))
+    else:
+        repeats = repeated or node.name in _NO_RESOLVE
+        node.args = tuple(intern(arg, table, repeats) for arg in node.args)
+        key = ("call", node.name, *map(id, node.args))
+    interned = table.setdefault(key, node)
+    interned.reused |= repeated or interned is not node
+    return interned
 
 
 
@@ -422,16 +511,30 @@ class Holder:
     def intdiv_(x,y): return x // y
     @staticmethod
     def iter_(s,x,y):
-        return [resolve(x, *s) for i in range(resolve(y, *s))]
+        y = repetitions(s, y) ; vector = samples(s, x, y)
+        if vector is not None: return vector.tolist()
+        x = compiled(x) # Compiled once, called for every sample
+        return [x(*s) for i in range(y)]
     @staticmethod
     def iteravg_(s,x,y=1000):
-        return Holder.avg_(*[resolve(x, *s) for i in range(resolve(y, *s))])
+        y = repetitions(s, y) ; vector = samples(s, x, y, flat = True)
+        # Averaged as the numbers of the evaluation average
+        numbers = s[2].numbers
+        if vector is not None: return numbers.functions.get("div", Holder.div_)(vector.sum().item(), y)
+        x = compiled(x) # Compiled once, called for every sample
+        return numbers.functions.get("avg", Holder.avg_)(*[x(*s) for i in range(y)])
     @staticmethod
     def itermax_(s,x,y=1000):
-        return Holder.max_(*[resolve(x, *s) for i in range(resolve(y, *s))])
+        y = repetitions(s, y) ; vector = samples(s, x, y, flat = True)
+        if vector is not None: return vector.max().item()
+        x = compiled(x) # Compiled once, called for every sample
+        return Holder.max_(*[x(*s) for i in range(y)])
     @staticmethod
     def itermin_(s,x,y=1000):
-        return Holder.min_(*[resolve(x, *s) for i in range(resolve(y, *s))])
+        y = repetitions(s, y) ; vector = samples(s, x, y, flat = True)
+        if vector is not None: return vector.min().item()
+        x = compiled(x) # Compiled once, called for every sample
+        return Holder.min_(*[x(*s) for i in range(y)])
     @staticmethod
     def keephigh_(x,*y): 
         return sorted(flatten(y),reverse=True)[:x]
@@ -465,7 +568,7 @@ class Holder:
     @staticmethod
     def mul_(*x): return math.prod(x)
     @staticmethod
-    def nand(*x): return not Holder.and_(*x)
+    def nand_(*x): return not Holder.and_(*x)
     @staticmethod
     def neq_(x,y): return x != y
     @staticmethod
@@ -481,13 +584,7 @@ class Holder:
     @staticmethod
     def pow_(x,y): return x**y
     @staticmethod
-    def range_(x, y=None):
-        if y is None:
-            if x<0: return list(range(x,0))
-            else: return list(range(1,x+1))
-        else:
-            if x>y: x,y = y,x
-            return list(range(x,y+1))
+    def range_(x, y=None): return list(stream_range(x, y))
     @staticmethod
     def round_(x,y=1): return round(x,y) if y>1 else int(round(x,y))
     @staticmethod
@@ -504,6 +601,7 @@ class Holder:
     def try_(s,*x):
         for i in x:
             try: return resolve(i, *s)
+            except TimeoutError: raise # Out of budget, for every alternative
             except: pass
         return None
     @staticmethod
@@ -515,79 +613,429 @@ class Holder:
 
 
 
+##################################################
+# NUMBERS
+##################################################
+
+
+
+class Numbers:
+    """
+    Numbers an evaluation works with. By default, literals are int or float,
+    and integral floats become int so functions that depend on it work.
+    """
+    name = "float"
+    functions = {} # Functions replaced in this mode, by name
+
+    def literal(self, node: Num) -> any:
+        """Value of a numeric literal."""
+        return node.value
+
+
+    def result(self, value: any) -> any:
+        """Value given by a function, as used by the rest of the evaluation."""
+        if isinstance(value, float) and value.is_integer(): return int(value)
+        return value
+
+
+    def context(self) -> any:
+        """Context manager the evaluation runs in."""
+        return nullcontext()
+
+
+def exact(*x) -> bool:
+    """Whether all values are exact numbers (int, Fraction or Decimal)."""
+    return all(isinstance(i, (int, Fraction, Decimal)) for i in x)
+
+
+class Fractions(Numbers):
+    """Exact rationals: literals, divisions and averages of exact numbers are Fractions."""
+    name = "fraction"
+    functions = {
+        "div": lambda x, y: Fraction(x) / Fraction(y) if exact(x, y) else x / y,
+        "pow": lambda x, y: fraction_pow(x, y),
+        "avg": lambda *x: Fraction(sum(x)) / len(x) if exact(*x) else Holder.avg_(*x)
+    }
+
+    def literal(self, node: Num) -> any:
+        return self.result(Fraction(node.text))
+
+
+    def result(self, value: any) -> any:
+        if isinstance(value, Fraction) and value.denominator == 1: return int(value)
+        return super().result(value)
+
+
+def fraction_pow(x: any, y: any) -> any:
+    """x ** y as a Fraction, refused before computing it if a negative y makes it too large."""
+    if not exact(x, y): return x ** y
+    if isinstance(y, int) and y < 0 and -y * bits(x) > _MAX_BITS:
+        raise OverflowError(f"result would exceed {_MAX_DIGITS} digits")
+    return Fraction(x) ** y
+
+
+class Decimals(Numbers):
+    """
+    Decimal numbers, to the given precision (significant digits).
+    Floats given by functions (sqrt, sin...) are rounded to it.
+    """
+    name = "decimal"
+    functions = {
+        "div": lambda x, y: Decimal(x) / Decimal(y) if exact(x, y) else x / y,
+        "pow": lambda x, y: Decimal(x) ** Decimal(y) if exact(x, y) else x ** y,
+        "avg": lambda *x: Decimal(sum(x)) / len(x) if exact(*x) else Holder.avg_(*x)
+    }
+
+    def __init__(self, precision: int = 28) -> None:
+        self.precision = precision
+
+
+    def literal(self, node: Num) -> any:
+        return self.result(Decimal(node.text))
+
+
+    def result(self, value: any) -> any:
+        if isinstance(value, float): value = Context(self.precision).create_decimal_from_float(value)
+        if isinstance(value, Decimal) and value.is_finite():
+            if abs(value.adjusted()) < _MAX_DIGITS and value == value.to_integral_value(): return int(value)
+            return value.normalize() # Without trailing zeros
+        return value
+
+
+    def context(self) -> any:
+        return localcontext(Context(self.precision))
+
+
+_FLOATS = Numbers()
+_NUMBERS = {"float": Numbers, "fraction": Fractions, "decimal": Decimals}
+
+
+def numeric(name: str = "float", precision: int = 28) -> Numbers:
+    """Numbers of the given mode, in ['float'|'fraction'|'decimal']."""
+    if name not in _NUMBERS: raise ValueError(f"Unknown numeric mode '{name}'")
+    return Decimals(precision) if name == "decimal" else _NUMBERS[name]()
+
+
+
+##################################################
+# BUDGET
+##################################################
+
+
+
+class Budget:
+    """
+    Time and steps an evaluation may still spend, shared by all its calls,
+    along with the numbers it works with and the results of its pure calls (by node).
+    Checked on every call and charged for loops before they run,
+    so a runaway expression stops on its own instead of after its thread was abandoned.
+    """
+    __slots__ = ("start", "steps", "numbers", "memo")
+
+    def __init__(self, start: float = None, steps: int = _STEPS, numbers: 'Numbers' = None) -> None:
+        self.start = time() if start is None else start
+        self.steps = steps
+        self.numbers = _FLOATS if numbers is None else numbers
+        self.memo = {}
+
+
+    def spend(self, steps: int = 1) -> None:
+        """Charge steps, raise TimeoutError if the time or the steps are exhausted."""
+        self.steps -= steps
+        if self.steps < 0: raise TimeoutError("Execution exceeded its step budget.")
+        if time() - self.start >= _ARG_TIMEOUT: raise TimeoutError("Execution timed out.")
+
+
+def repetitions(s: tuple, y: Node) -> any:
+    """Iteration count of an iteration function, charged to the budget before looping."""
+    y = resolve(y, *s)
+    if isinstance(y, int) and y > 0: s[2].spend(y)
+    return y
+
+
+def bits(x: any) -> float:
+    """Size of an exact number in bits (its largest part for a fraction, 0 for floats)."""
+    if isinstance(x, bool): return 0
+    if isinstance(x, int): return math.log2(abs(x)) if x else 0
+    if isinstance(x, Fraction): return max(bits(x.numerator), bits(x.denominator))
+    # Decimals only have as many significant digits as their precision
+    if isinstance(x, Decimal) and x.is_finite() and x: return max(x.adjusted(), 0) * math.log2(10)
+    return 0
+
+
+def too_large(value: any) -> bool:
+    """Whether a value is a number longer than _MAX_DIGITS (ints checked first, as most common)."""
+    if type(value) is int: return value.bit_length() > _MAX_BITS
+    return isinstance(value, (Fraction, Decimal)) and bits(value) > _MAX_BITS
+
+
+def perm_bits(n: any, k: any = None) -> float:
+    """Size (bits) of perm(n, k), which is also an upper bound of comb(n, k)."""
+    if not isinstance(n, int) or n <= 0: return 0
+    k = min(max(k, 0), n) if isinstance(k, int) else n
+    return (math.lgamma(n + 1) - math.lgamma(n - k + 1)) / math.log(2)
+
+
+def range_size(x: range) -> int:
+    """Length of a range, even beyond what len() can give."""
+    try: return len(x)
+    except OverflowError: return max(0, (x.stop - x.start + x.step + (-1 if x.step > 0 else 1)) // x.step)
+
+
+def size(*x) -> int:
+    """Amount of values in the arguments of a function (lists and ranges count their items)."""
+    return sum(range_size(i) if type(i) is range else len(i) if isiterable(i) else 1 for i in x)
+
+
+def kept(x: any = 0, *y) -> int:
+    """Values keephigh() and keeplow() read: only the x they keep from a single range (sliced)."""
+    if len(y) == 1 and type(y[0]) is range and type(x) is int and x >= 0: return min(x, range_size(y[0]))
+    return size(*y)
+
+
+# Steps a function spends before running, from its arguments (1 for others)
+_COSTS = {
+    "range": lambda x = 0, y = None, *_: abs(x) if y is None else abs(y - x) + 1,
+    "flatten": size,
+    "keephigh": kept,
+    "keeplow": kept,
+    "keephighlow": lambda x = 0, y = 0, *z: size(*z)
+}
+# Estimated size (bits) of the integer a function gives, to refuse it before computing it
+_SIZES = {
+    "pow": lambda x = 0, y = 0, *_: y * bits(x) if isinstance(y, int) and y > 0 else 0,
+    "sqr": lambda x = 0, *_: 2 * bits(x),
+    "mul": lambda *x: sum(bits(i) for i in x),
+    "lcm": lambda *x: sum(bits(i) for i in x),
+    "factorial": lambda x = 0, *_: perm_bits(x),
+    "perm": lambda x = 0, y = None, *_: perm_bits(x, y),
+    "comb": lambda x = 0, y = 0, *_: min(perm_bits(x, y), x if isinstance(x, int) else 0)
+}
+
+
+
+##################################################
+# STREAMS
+##################################################
+
+
+
+# Lazy sequences, only given to functions consuming them as streams
+_LAZY_TYPES = (range, GeneratorType)
+
+
+def iflatten(x: any) -> any:
+    """Values of nested sequences (lazy ones included), one at a time."""
+    for i in x:
+        if type(i) is range: yield from i # Only numbers
+        elif isiterable(i) or type(i) is GeneratorType: yield from iflatten(i)
+        else: yield i
+
+
+def concrete(x: any) -> any:
+    """A list instead of a lazy sequence."""
+    return list(x) if type(x) in _LAZY_TYPES else x
+
+
+def stream_range(x: int, y: int = None) -> range:
+    """Values of range(), as a range object."""
+    if y is None: return range(x, 0) if x < 0 else range(1, x + 1)
+    if x > y: x, y = y, x
+    return range(x, y + 1)
+
+
+def stream_flatten(*x) -> any:
+    """flatten() as a generator."""
+    return iflatten(x)
+
+
+def stream_flatten_list(numbers: Numbers, *x) -> list:
+    """flatten() of lazy sequences, as a list."""
+    return list(iflatten(x))
+
+
+def stream_iter(s: tuple, x: Node, y: Node) -> any:
+    """iter() as a generator of its samples (a list if they are vectorized)."""
+    y = repetitions(s, y) ; vector = samples(s, x, y)
+    if vector is not None: return vector.tolist()
+    x = compiled(x) # Compiled once, called for every sample
+    return (x(*s) for i in range(y))
+
+
+def stream_sum(numbers: Numbers, x: any) -> any:
+    """sum() of a lazy sequence (in constant time for a range)."""
+    if isinstance(x, range): return range_size(x) * (x[0] + x[-1]) // 2 if x else 0
+    return sum(x)
+
+
+def stream_avg(numbers: Numbers, x: any) -> any:
+    """avg() of a lazy sequence, divided as the numbers divide."""
+    if isinstance(x, range): total, count = stream_sum(numbers, x), range_size(x)
+    else:
+        total = count = 0
+        for i in x: total += i ; count += 1
+    return numbers.functions.get("div", Holder.div_)(total, count)
+
+
+def stream_len(numbers: Numbers, x: any) -> int:
+    """len() of a lazy sequence."""
+    return range_size(x) if isinstance(x, range) else sum(1 for i in x)
+
+
+def stream_max(numbers: Numbers, x: any) -> any:
+    """max() of a lazy sequence."""
+    return x[-1] if isinstance(x, range) and x else max(x)
+
+
+def stream_min(numbers: Numbers, x: any) -> any:
+    """min() of a lazy sequence."""
+    return x[0] if isinstance(x, range) and x else min(x)
+
+
+def stream_keephigh(numbers: Numbers, x: int, *y) -> list:
+    """keephigh() of lazy sequences, only holding the x highest values while reading them."""
+    if type(x) is not int or x < 0: return Holder.keephigh_(x, *map(concrete, y))
+    if len(y) == 1 and type(y[0]) is range: return list(y[0][:-x - 1:-1]) if x else []
+    return nlargest(x, iflatten(y))
+
+
+def stream_keeplow(numbers: Numbers, x: int, *y) -> list:
+    """keeplow() of lazy sequences, only holding the x lowest values while reading them."""
+    if type(x) is not int or x < 0: return Holder.keeplow_(x, *map(concrete, y))
+    if len(y) == 1 and type(y[0]) is range: return list(y[0][:x])
+    return nsmallest(x, iflatten(y))
+
+
+# Functions giving a lazy sequence to a stream, with the steps they spend (before reading it)
+_LAZY = {"range": (stream_range, None), "flatten": (stream_flatten, size), "iter": (stream_iter, None)}
+# Functions consuming lazy sequences, f(numbers, *arguments), with their first streamed argument
+# (None: only a single argument, as sum(range(...)) but not sum(range(...), 1))
+_STREAMS = {
+    "sum": (stream_sum, None), "avg": (stream_avg, None), "len": (stream_len, None),
+    "max": (stream_max, None), "min": (stream_min, None),
+    "keephigh": (stream_keephigh, 1), "keeplow": (stream_keeplow, 1),
+    "flatten": (stream_flatten_list, 0)
+}
+
+
+
 ##################################################
 # RESOLVE
 ##################################################
 
 
 
-def resolve(txt: str, stack: list = [], source: dict = None, start: float = None) -> any:
+def function(name: str, source: dict) -> callable:
+    """Function called by name in an expression."""
+    if name in _LOGIC_FUNC:
+        origin = _LOGIC_FUNC[name]["origin"]
+        if origin == "math": return getattr(math, name)
+        if origin == "random": return getattr(random, name)
+        return getattr(Holder, name + "_")
+    if name in source: return source[name]
+    raise NameError(f"Function '{name}' is not recognized.")
+
+
+def resolve(txt: Node|str, stack: list = [], source: dict = None,
+        start: Budget|float = None) -> any:
     """
-    Resolve the nested expression recursively.
+    Resolve a parsed expression (an expression text is parsed first).
+    start is the budget of the evaluation (or its start time, to create it).
     Basically a whole ride to avoid 'eval()'
     """
-    if start is None: start = time()
-    elif time() - start >= _ARG_TIMEOUT:
-        raise TimeoutError("Execution timed out.")
+    if not isinstance(start, Budget): start = Budget(start)
+    start.spend()
     if not txt: return None
     # Source must be {'name': func}
     if source is None: source = {}
-    if not isinstance(txt, str):
-        return txt
-    # Cull unecessary brackets
-    while txt.startswith('('):
-        txt = txt[1:-1]
-    # If it is a number, just get the value
-    if is_num(txt):
-        if '.' in txt:
-            return float(txt)
-        return int(txt)
-    
-    # If it is a function, get its name
-    section = analyse(txt, 0)
-    if section.type == "alpha": # And get the actual object from it
-        args = get_args(txt[section.end+2 :-1])
-        name = section.content
-        if name in _LOGIC_FUNC:
-            origin = _LOGIC_FUNC[name]["origin"]
-            if origin == "math":
-                func = getattr(math, name)
-            elif origin == "random":
-                func = getattr(random, name)
-            else: func = getattr(Holder, name + "_")
-        elif name in source: func = source[name]
-        else: raise NameError(f"Function '{name}' is not recognized.")
-    else: # Arguments
-        args = get_args(txt)
-        return [resolve(arg, stack, source, start) for arg in args]
-
-    # Iteration logic already uses resolve
-    if name not in _NO_RESOLVE and name not in source:
-        # Resolve arguments
-        arguments = [resolve(arg, stack, source, start) for arg in args]
-        # Cull None returns
-        arguments = [arg for arg in arguments if arg not in [None, ""]]
-        # Remove iterables
-        if len(arguments) == 1:
-            if isiterable(arguments[0]):
-                arguments = arguments[0]
-    else:
-        args = [arg for arg in args if arg not in [None, ""]]
-        arguments = [(stack, source, start)] + args
-
-    # Call the function with the arguments
-    try: result = func(*arguments)
-    except Exception as e:
-        name.removesuffix("hold_") ; name.removesuffix("_")
-        raise e.__class__(f"An error occured when running '{name}': {e}")
-    # To integer if possible, so functions that depend on it work
-    if isinstance(result, float) and \
-        result.is_integer(): result = int(result)
-    # Add it to the call stack (if it's not an iterable)
-    if name == "extract":
-        if not isiterable(result):
-            stack.append(result)
-    return result
+    if isinstance(txt, str): txt = compile_expression(txt)[0]
+    if not isinstance(txt, Node): return txt
+    return txt.compiled()(stack, source, start)
+
+
+def compiled(txt: Node|str) -> callable:
+    """Closure resolving a node, an expression text or a value: code(stack, source, budget)."""
+    if isinstance(txt, str): txt = compile_expression(txt)[0]
+    if isinstance(txt, Node): return txt.compiled()
+    return lambda stack, source, budget: resolve(txt, stack, source, budget)
+
+
+def compile_node(node: Node, streamed: bool = False) -> callable:
+    """
+    Turn a node into nested closures, code(stack, source, budget), so that resolving it
+    again (in iterations for example) only costs function calls, not walking the tree.
+    Streamed, range(), flatten() and iter() give lazy sequences instead of lists.
+    """
+    # Other nodes are the same streamed or not
+    if streamed and not (isinstance(node, Call) and node.name in _LAZY): return node.compiled()
+    # If it is a number, just get the value (in the numbers of the evaluation)
+    if isinstance(node, Num): return lambda stack, source, budget: budget.numbers.literal(node)
+    # Arguments
+    if isinstance(node, Seq):
+        items = [item.compiled() for item in node.items]
+        return lambda stack, source, budget: [item(stack, source, budget) for item in items]
+
+    name = node.name ; args = node.args
+    # Built-in functions are known now, others come from the source
+    func = function(name, {}) if name in _LOGIC_FUNC else None
+    cost = _COSTS.get(name) ; estimate = _SIZES.get(name)
+    if streamed: func, cost = _LAZY[name]
+    # Arguments read as streams, by a function consuming them
+    consumer, first = _STREAMS.get(name, (None, 0))
+    codes = [arg.compiled(consumer is not None and (len(args) == 1 if first is None else i >= first))
+        for i, arg in enumerate(args)]
+    lazy = name in _NO_RESOLVE
+    extract = name == "extract"
+    # Pure calls resolved several times are resolved once per evaluation (not constants or streams)
+    memoize = node.pure and node.reused and bool(args) and not streamed
+
+    def call(stack: list, source: dict, budget: Budget) -> any:
+        budget.spend()
+        if memoize and node in budget.memo: return budget.memo[node]
+        # Source functions get their arguments unresolved
+        if func is None: called = function(name, source) ; arguments = [(stack, source, budget), *args]
+        # Iteration logic already uses resolve
+        elif lazy: called = func ; arguments = [(stack, source, budget), *args]
+        else:
+            called = budget.numbers.functions.get(name, func)
+            # Resolve arguments
+            arguments = [code(stack, source, budget) for code in codes]
+            # Cull None returns
+            arguments = [arg for arg in arguments if arg is not None and arg != ""]
+            # Lazy sequences are read by the stream consumer (or the lazy function itself)
+            if consumer and any(type(arg) in _LAZY_TYPES for arg in arguments):
+                if not streamed: called = partial(consumer, budget.numbers)
+            # Remove iterables
+            elif len(arguments) == 1:
+                if isiterable(arguments[0]):
+                    arguments = arguments[0]
+
+        # Call the function with the arguments, if it is affordable
+        try:
+            if cost: budget.spend(cost(*arguments))
+            if estimate and estimate(*arguments) > _MAX_BITS:
+                raise OverflowError(f"result would exceed {_MAX_DIGITS} digits")
+            result = budget.numbers.result(called(*arguments))
+            if too_large(result): raise OverflowError(f"result exceeds {_MAX_DIGITS} digits")
+        except Exception as e:
+            raise e.__class__(f"An error occured when running '{name}': {e}")
+        # Add it to the call stack (if it's not an iterable)
+        if extract:
+            if not isiterable(result):
+                stack.append(result)
+        if memoize: budget.memo[node] = result
+        return result
+    return call
+
+
+def functions_of(node: Node) -> set[str]:
+    """Names of the functions called in a parsed expression."""
+    names = set() ; nodes = [node]
+    while nodes:
+        node = nodes.pop()
+        if isinstance(node, Call): names.add(node.name) ; nodes.extend(node.args)
+        elif isinstance(node, Seq): nodes.extend(node.items)
+    return names
 
 
 def get_args(txt: str, comments: str = None) -> list:
@@ -615,6 +1063,114 @@ def get_args(txt: str, comments: str = None) -> list:
 
 
 
+##################################################
+# VECTORIZED
+##################################################
+
+
+
+def samples(s: tuple, x: Node, count: int, flat: bool = False) -> any:
+    """
+    count samples of x generated at once with numpy (a vector, or a matrix for lists),
+    or None if x is not made of vectorizable functions only, or numpy is not installed.
+    """
+    if numpy is None or not isinstance(count, int) or count < _VECTOR_MIN: return None
+    vector = vectorize(x, numpy.random.default_rng(), count, s[1])
+    if vector is None or (flat and vector.ndim != 1): return None
+    return vector
+
+
+def vectorize(node: Node, generator, size: int, source: dict) -> any:
+    """size samples of a node at once, or None if it cannot be vectorized."""
+    if isinstance(node, Num): # Only integers int64 vectors hold
+        value = constant(node)
+        return None if value is None or abs(value) >= _VECTOR_BOUND else numpy.full(size, value)
+    if not isinstance(node, Call): return None
+    func = function(node.name, {}) if node.name in _LOGIC_FUNC else source.get(node.name)
+    vectorized = _VECTORS.get(func)
+    if vectorized is None: return None
+    return vectorized(generator, size, source, *node.args)
+
+
+def constant(node: Node) -> int|None:
+    """Value of an integer literal node (None otherwise)."""
+    if isinstance(node, Num) and isinstance(node.value, int): return node.value
+    return None
+
+
+def magnitude(*vectors) -> int:
+    """Largest absolute value among vectors."""
+    return max((int(numpy.abs(v).max()) for v in vectors if v.size), default = 0)
+
+
+def vector_args(generator, size: int, source: dict, args: tuple, ndim: int = 1) -> list|None:
+    """Vectors of all args (of the given dimension), or None if one cannot be vectorized."""
+    vectors = []
+    for arg in args:
+        vector = vectorize(arg, generator, size, source)
+        if vector is None or vector.ndim != ndim: return None
+        vectors.append(vector)
+    return vectors
+
+
+def vector_sum(generator, size: int, source: dict, *args) -> any:
+    if len(args) == 1: # Sum of each list (as a single iterable argument is unpacked)
+        vectors = vector_args(generator, size, source, args, 2)
+        if vectors is None: return vectors
+        if magnitude(*vectors) * vectors[0].shape[1] >= _VECTOR_BOUND: return None
+        return vectors[0].sum(axis = 1)
+    vectors = vector_args(generator, size, source, args)
+    if vectors is None or magnitude(*vectors) * len(vectors) >= _VECTOR_BOUND: return None
+    return sum(vectors[1:], vectors[0])
+
+
+def vector_sub(generator, size: int, source: dict, *args) -> any:
+    vectors = vector_args(generator, size, source, args)
+    if vectors is None or len(vectors) != 2 or 2 * magnitude(*vectors) >= _VECTOR_BOUND: return None
+    return vectors[0] - vectors[1]
+
+
+def vector_mul(generator, size: int, source: dict, *args) -> any:
+    vectors = vector_args(generator, size, source, args)
+    if vectors is None or len(vectors) < 2: return None
+    if math.prod(magnitude(v) for v in vectors) >= _VECTOR_BOUND: return None
+    return math.prod(vectors[1:], start = vectors[0])
+
+
+def vector_iter(generator, size: int, source: dict, x: Node = None, y: Node = None) -> any:
+    count = constant(y)
+    if count is None or count < 0 or size * count > _VECTOR_MAX: return None
+    vector = vectorize(x, generator, size * count, source)
+    if vector is None or vector.ndim != 1: return None
+    return vector.reshape(size, count)
+
+
+def vector_keephigh(generator, size: int, source: dict, x: Node = None, *y) -> any:
+    vectors = vector_args(generator, size, source, y, 2)
+    if constant(x) is None or vectors is None or len(vectors) != 1: return None
+    return numpy.sort(vectors[0], axis = 1)[:, ::-1][:, :constant(x)]
+
+
+def vector_keeplow(generator, size: int, source: dict, x: Node = None, *y) -> any:
+    vectors = vector_args(generator, size, source, y, 2)
+    if constant(x) is None or vectors is None or len(vectors) != 1: return None
+    return numpy.sort(vectors[0], axis = 1)[:, :constant(x)]
+
+
+def vector_randint(generator, size: int, source: dict, *args) -> any:
+    if len(args) != 2 or None in (bounds := [constant(arg) for arg in args]): return None
+    if bounds[0] > bounds[1] or magnitude(numpy.array(bounds)) >= _VECTOR_BOUND: return None
+    return generator.integers(bounds[0], bounds[1] + 1, size)
+
+
+_VECTORS.update({
+    Holder.sum_: vector_sum, Holder.sub_: vector_sub, Holder.mul_: vector_mul,
+    Holder.iter_: vector_iter, Holder.keephigh_: vector_keephigh, Holder.keeplow_: vector_keeplow,
+    random.randint: vector_randint
+})
+
+
+
 ##################################################
 # MAIN
 ##################################################
@@ -631,45 +1187,129 @@ def noresolve_stack(stack: list, expression: str,
     stack.append(comment + ": " + expression) # Add to the stack
 
 
-def main(txt: str, stack: list = None, source: dict = None,
-        start: float = None, noresolve: bool = False) -> any:
-    """Resolve and output the given expression"""
-    if stack is None: stack = []
-
+@lru_cache(maxsize = _CACHE_SIZE)
+def compile_expression(txt: str) -> tuple[Node|None, tuple]:
+    """
+    Parse an expression into its tree (None if there is nothing to evaluate),
+    with the intermediary steps as (comment, expression) pairs.
+    Cached, as it only depends on the text.
+    """
     # Sanitize expression and ensure it is properly formatted
     cleanup_ = cleanup(txt)
-    noresolve_stack(stack, cleanup_, "Sanatized", noresolve)
+    steps = [("Sanatized", cleanup_)]
     # If there is nothing to evaluate
-    if not cleanup_: raise SyntaxError("No valid expression to evaluate")
-
-    # Replace low-level symbols by their primary symbol
-    symbols_ = replace_simple(cleanup_, _SYMBOLS)
-    noresolve_stack(stack, symbols_, "Symbols", noresolve)
-
-    # Replace low-level func aliases by their primary name
-    aliases_ = replace_targeted(symbols_, _NAMES, False)
-    noresolve_stack(stack, aliases_, "Aliases", noresolve)
-
-    # Replace constants by their function
-    constants_ = replace_targeted(aliases_, _CONSTANTS, True)
-    noresolve_stack(stack, constants_, "Constants", noresolve)
-
-    # Implicit 0 in _.123, 123._, _-1 or _+1
-    implicit_ = implicit_zero(constants_)
-    noresolve_stack(stack, implicit_, "Implicit '0'", noresolve)
-
-    # Place asterixes on implicit multiplication )*(
-    # Note that some have already been spotted using replace_targeted()
-    multiply_ = implicit_multiplication(implicit_)
-    noresolve_stack(stack, multiply_, "Implicit '*'", noresolve)
-
-    # Replace top-level symbols by their function
-    # In two parts : 'AFTER' symbols (!²#~ etc), then others by priority
-    functions_ = place_functions(multiply_)
-    noresolve_stack(stack, functions_, "Functions", noresolve)
-    
-    # And now, actually resolve the expression recursively
-    result = None if noresolve else resolve(functions_, stack, source, start)
+    if not cleanup_: return None, tuple(steps)
+
+    # Single pass over the text: numbers, names, symbols and parentheses
+    tokens = tokenize(cleanup_)
+    steps.append(("Tokens", " ".join(content for kind, content in tokens)))
+
+    # Aliases, constants, implicit '0' and '*', and symbols by priority, all at once
+    # Identical subtrees become one node
+    tree = intern(Parser(tokens).parse(), {})
+    steps.append(("Functions", str(tree)))
+    return tree, tuple(steps)
+
+
+# Functions never folded, as they give sequences (or nothing)
+# (those reading streams are only folded from numbers, so never read one)
+_UNFOLDED = {*_LAZY, "keephigh", "keeplow", "keephighlow", "list", "nonehold"}
+
+
+def fold(node: Node, budget: Budget) -> Node:
+    """
+    Tree with its constant subtrees (pure calls of literals) replaced by their value, as floats.
+    Only calls giving a number are resolved: the others, and calls that fail,
+    are kept to be resolved as usual.
+    """
+    if isinstance(node, Seq): return Seq([fold(item, budget) for item in node.items])
+    if not isinstance(node, Call): return node
+    call = Call(node.name, [fold(arg, budget) for arg in node.args])
+    if not call.pure or call.name in _UNFOLDED: return call
+    if not all(isinstance(arg, Num) for arg in call.args): return call
+    try: value = call.compiled()([], {}, budget)
+    except Exception: return call
+    return Num(value) if type(value) in (int, float, bool) else call
+
+
+@lru_cache(maxsize = _CACHE_SIZE)
+def fold_expression(txt: str) -> tuple[Node|None, tuple]:
+    """
+    compile_expression() with its constant subtrees folded, for evaluations with floats,
+    and the folded expression as a last step. Cached, so constant inputs are only computed once.
+    """
+    tree, steps = compile_expression(txt)
+    if tree is None: return tree, steps
+    # Identical subtrees become one node again
+    tree = intern(fold(tree, Budget()), {})
+    return tree, steps + (("Folded", str(tree)),)
+
+
+def is_deterministic(tree: Node) -> bool:
+    """Whether a parsed expression always gives the same result."""
+    return _RANDOM.isdisjoint(functions_of(tree))
+
+
+_RESULTS = OrderedDict() # Deterministic tree -> (result, is a list, extracted values), least recent first
+_RESULTS_LOCK = Lock() # Evaluations run in several threads
+
+
+def scalar(value: any) -> bool:
+    """Whether a value is a number (or a string, or None)."""
+    return value is None or isinstance(value, (int, float, Fraction, Decimal, str))
+
+
+def cached_result(tree: Node) -> tuple[any, tuple]|None:
+    """Result of a deterministic expression and the values it extracted, if kept (a list is copied)."""
+    with _RESULTS_LOCK:
+        cached = _RESULTS.get(tree)
+        if cached is None: return None
+        _RESULTS.move_to_end(tree)
+    result, is_list, extracted = cached
+    return (list(result) if is_list else result), extracted
+
+
+def keep_result(tree: Node, result: any, extracted: list) -> None:
+    """
+    Keep the result of a deterministic expression if it is small:
+    a number, or a short list of numbers (kept as a tuple, so no caller can alter it).
+    """
+    if len(extracted) > _CACHE_ITEMS: return
+    is_list = isinstance(result, list)
+    if is_list or isinstance(result, tuple):
+        if len(result) > _CACHE_ITEMS or not all(scalar(i) for i in result): return
+        result = tuple(result)
+    elif not scalar(result): return
+    with _RESULTS_LOCK:
+        _RESULTS[tree] = result, is_list, tuple(extracted)
+        if len(_RESULTS) > _CACHE_SIZE: _RESULTS.popitem(last = False)
+
+
+def main(txt: str, stack: list = None, source: dict = None,
+        start: float = None, noresolve: bool = False, numbers: Numbers = None) -> any:
+    """Resolve and output the given expression (with floats, or the given numbers)"""
+    if stack is None: stack = []
+
+    # Constants are folded with floats, other numbers resolve the whole expression
+    tree, steps = compile_expression(txt) if numbers is not None else fold_expression(txt)
+    for comment, expression in steps:
+        noresolve_stack(stack, expression, comment, noresolve)
+    if tree is None: raise SyntaxError("No valid expression to evaluate")
+    if noresolve: return None, stack
+
+    # Without other functions than the built-in ones, the same input gives the same result
+    deterministic = source is None and numbers is None and is_deterministic(tree)
+    cached = cached_result(tree) if deterministic else None
+    if cached is not None:
+        result, extracted = cached
+        stack.extend(extracted)
+        return result, stack
+
+    # And now, actually resolve the expression recursively (within the time the caller has left)
+    budget = Budget(start, numbers = numbers) ; extracted = len(stack)
+    with budget.numbers.context():
+        result = resolve(tree, stack, source, budget)
+    if deterministic: keep_result(tree, result, stack[extracted:])
     return result, stack
 
 
@@ -0,0 +1,88 @@
+"""
+Registry of static resource files (Resources/Files/), read once and shared.
+Json resources are frozen (read-only mappings, tuples instead of lists),
+so no caller can alter what the others see. Text resources are strings.
+"""
+
+
+
+##################################################
+# IMPORTS
+##################################################
+
+
+
+from types import MappingProxyType
+from collections.abc import Mapping
+
+from Modules.data import data
+
+
+
+##################################################
+# GLOBALS
+##################################################
+
+
+
+_DIRECTORY = "Resources/Files/"
+_RESOURCES = {} # Name (path relative to _DIRECTORY) -> frozen content
+
+
+
+##################################################
+# FUNCTIONS
+##################################################
+
+
+
+def freeze(value: any) -> any:
+    """Immutable version of a json value."""
+    if isinstance(value, dict): return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list): return tuple(freeze(v) for v in value)
+    return value
+
+
+def resource(name: str) -> Mapping|str:
+    """
+    Content of a resource file (name relative to Resources/Files/),
+    read from disk on first use only. Raise FileNotFoundError if it is missing.
+    """
+    content = _RESOURCES.get(name)
+    if content is None:
+        content = _RESOURCES[name] = freeze(data(_DIRECTORY + name, filenotfound = False))
+    return content
+
+
+def resource_json(name: str) -> Mapping:
+    """Content of a json resource file, as a read-only mapping."""
+    content = resource(name)
+    if not isinstance(content, Mapping): raise TypeError(f"Resource {name} is not a json object")
+    return content
+
+
+def resource_txt(name: str) -> str:
+    """Content of a text resource file."""
+    content = resource(name)
+    if not isinstance(content, str): raise TypeError(f"Resource {name} is not a text file")
+    return content
+
+
+def reload_resources(*names: str) -> None:
+    """
+    Forget the given resources (every one by default), so they are read again on next use.
+    Tables built from a resource at import keep the version they were built from.
+    """
+    if not names: _RESOURCES.clear()
+    for name in names: _RESOURCES.pop(name, None)
+
+
+
+##################################################
+# MAIN
+##################################################
+
+
+
+if __name__ == "__main__":
+    pass
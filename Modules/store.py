@@ -0,0 +1,212 @@
+"""
+Asynchronous storage of json sources in the bot database (Postgres JSONB).
+Mirrors Modules.data.data(), so data files remain usable as a fallback backend.
+"""
+
+
+
+##################################################
+# IMPORTS
+##################################################
+
+
+
+from json import dumps, loads
+from contextlib import asynccontextmanager
+from asyncpg import Pool
+
+from Modules.data import data, adata, data_remove, explore_struct, atransaction
+
+
+
+##################################################
+# STORE
+##################################################
+
+
+
+class Store:
+    """
+    Json sources kept in the '<schema>.documents' table, one row per first key
+    (for example one row per guild for "Data/servers.json").
+    Writes below the first key are partial updates (jsonb_set) of a single row.
+    """
+    def __init__(self, db: Pool, schema: str = "public") -> None:
+        self.db = db
+        self.schema = schema
+        self.table = f'"{schema}".documents'
+
+
+    @classmethod
+    async def create(cls, db: Pool, schema: str = "public", *sources: str) -> 'Store':
+        """
+        Create the store (and its table if needed).
+        Sources with no row yet are imported from their data files.
+        """
+        store = cls(db, schema)
+        async with db.acquire() as conn:
+            await conn.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+            await conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {store.table} (
+                    source TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    content JSONB NOT NULL,
+                    PRIMARY KEY (source, key)
+                )""")
+        for source in sources: await store.migrate(source)
+        return store
+
+
+    async def data(self, source: str, value = None, *keys, read_only: bool|None = True,
+            keynotfound: bool|None = True) -> any:
+        """
+        Same as Modules.data.data() for json sources (filenotfound does not apply).
+        The first key selects the row, the others are a path inside its content.
+        """
+        if not keys: return await self.data_all(source, value, read_only)
+        key = str(keys[0]) ; path = [str(k) for k in keys[1:]]
+        async with self.db.acquire() as conn:
+            if read_only is not False: # Reading first
+                found = await conn.fetchval(f"""
+                    SELECT (content #> $3)::text FROM {self.table}
+                    WHERE source = $1 AND key = $2""", source, key, path)
+                if found is not None: return loads(found)
+                if keynotfound is False: raise KeyError(f"{keys} was not found in {source}")
+                if read_only is True or keynotfound is None: return value
+
+            # Parent object exists: single-row partial update
+            if keynotfound is True and path:
+                status = await conn.execute(f"""
+                    UPDATE {self.table} SET content = jsonb_set(content, $3, $4::jsonb)
+                    WHERE source = $1 AND key = $2 AND jsonb_typeof(content #> $5) = 'object'""",
+                    source, key, path, dumps(value), path[:-1])
+                if status == "UPDATE 1": return value if read_only is None else True
+
+            # Otherwise, apply data() semantics on the row content and save it whole
+            async with conn.transaction():
+                row = await conn.fetchval(f"""
+                    SELECT content::text FROM {self.table}
+                    WHERE source = $1 AND key = $2 FOR UPDATE""", source, key)
+                content = {} if row is None else {keys[0]: loads(row)}
+                out = explore_struct(content, value, *keys,
+                    read_only = read_only, keynotfound = keynotfound)
+                if out is True or (read_only is None and keynotfound is True):
+                    await self.upsert(conn, source, key, content[keys[0]])
+        return out
+
+
+    async def data_all(self, source: str, value = None, read_only: bool|None = True) -> any:
+        """Read or write every row of a source at once, as one document."""
+        async with self.db.acquire() as conn:
+            rows = await conn.fetch(f"""
+                SELECT key, content::text FROM {self.table}
+                WHERE source = $1""", source)
+            content = {row["key"]: loads(row["content"]) for row in rows}
+            if read_only is True or (read_only is None and content):
+                return content or value
+            value = value or {}
+            async with conn.transaction(): # Rewrite given rows and delete the others
+                await conn.execute(f"""
+                    DELETE FROM {self.table}
+                    WHERE source = $1 AND NOT key = ANY($2::text[])""",
+                    source, [str(k) for k in value])
+                for key, item in value.items():
+                    await self.upsert(conn, source, str(key), item)
+        return value if read_only is None else True
+
+
+    @asynccontextmanager
+    async def transaction(self, source: str, *keys):
+        """
+        Same as Modules.data.atransaction(): the object at keys ({} if missing)
+        is saved once at the end of the block, if it changed and nothing was raised.
+        The row stays locked (FOR UPDATE) meanwhile.
+        """
+        if not keys: raise IndexError("Must provide at least one key arg")
+        key = str(keys[0])
+        async with self.db.acquire() as conn, conn.transaction():
+            row = await conn.fetchval(f"""
+                SELECT content::text FROM {self.table}
+                WHERE source = $1 AND key = $2 FOR UPDATE""", source, key)
+            content = {} if row is None else loads(row)
+            value = explore_struct(content, {}, *keys[1:], read_only = True,
+                keynotfound = None) if keys[1:] else content
+            before = dumps(value)
+            yield value
+            if dumps(value) == before: return
+            if keys[1:]: explore_struct(content, value, *keys[1:], read_only = False, keynotfound = True)
+            else: content = value
+            await self.upsert(conn, source, key, content)
+
+
+    async def upsert(self, conn, source: str, key: str, content: any) -> None:
+        """Insert or replace the content of a row."""
+        await conn.execute(f"""
+            INSERT INTO {self.table} (source, key, content) VALUES ($1, $2, $3::jsonb)
+            ON CONFLICT (source, key) DO UPDATE SET content = EXCLUDED.content""",
+            source, key, dumps(content))
+
+
+    async def remove(self, source: str, *keys) -> bool:
+        """Same as Modules.data.data_remove(): delete the entry at keys."""
+        if not keys: raise IndexError("Must provide at least one key arg")
+        async with self.db.acquire() as conn:
+            if len(keys) == 1: status = await conn.execute(f"""
+                DELETE FROM {self.table} WHERE source = $1 AND key = $2""",
+                source, str(keys[0]))
+            else: status = await conn.execute(f"""
+                UPDATE {self.table} SET content = content #- $3
+                WHERE source = $1 AND key = $2 AND content #> $3 IS NOT NULL""",
+                source, str(keys[0]), [str(k) for k in keys[1:]])
+        return status.endswith(" 1")
+
+
+    async def migrate(self, source: str) -> int:
+        """Import the data file of a source, if the store has nothing for it yet."""
+        async with self.db.acquire() as conn:
+            if await conn.fetchval(f"""
+                SELECT EXISTS(SELECT 1 FROM {self.table} WHERE source = $1)""",
+                source): return 0
+        content = data(source, {}, filenotfound = None)
+        if content: await self.data_all(source, content, read_only = False)
+        return len(content)
+
+
+
+##################################################
+# FUNCTIONS
+##################################################
+
+
+
+async def bot_data(bot, source: str, value = None, *keys, **kwargs) -> any:
+    """Call data() through the bot store if it has one, through data files otherwise."""
+    store: Store = getattr(bot, "store", None)
+    if store is None: return await adata(source, value, *keys, **kwargs)
+    kwargs.pop("filenotfound", None) # Rows are created on demand
+    return await store.data(source, value, *keys, **kwargs)
+
+
+def bot_transaction(bot, source: str, *keys):
+    """Open a transaction through the bot store if it has one, on data files otherwise."""
+    store: Store = getattr(bot, "store", None)
+    if store is None: return atransaction(source, *keys)
+    return store.transaction(source, *keys)
+
+
+async def bot_data_remove(bot, source: str, *keys) -> bool:
+    """Call data_remove() through the bot store if it has one."""
+    store: Store = getattr(bot, "store", None)
+    if store is None: return data_remove(source, *keys)
+    return await store.remove(source, *keys)
+
+
+
+##################################################
+# MAIN
+##################################################
+
+
+
+if __name__ == "__main__":
+    pass
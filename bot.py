@@ -20,7 +20,7 @@ from subprocess import run, PIPE
 from asyncio import gather, Event, create_task
 from asyncio import run as asyncrun
 
-from Modules.data import data, path_from_root
+from Modules.data import data, path_from_root, flush
 from Modules.basic import makeiterable, correspond, least_one
 
 
@@ -41,6 +41,9 @@ async def build_bot(path: str):
     from Modules.Twitch.eventsub import EventSubManager
     from Extensions.Common import get_prefix
     from asyncpg import create_pool
+    from Modules.store import Store
+    from Modules.engine import EvaluationPool
+    from Modules.logic import numeric
     print(f"Starting bot '{path}'")
     
     if not path.endswith(".json"): path += ".json"
@@ -58,6 +61,15 @@ async def build_bot(path: str):
     connection_string = data("Secret/" + config["database"], filenotfound = False)
     bot.db = await create_pool(dsn = connection_string)
     bot.schema = config.get("schema", "public") # bot-specific schema in the db
+    # Guild data is kept in the database if requested, in data files otherwise
+    bot.store = await Store.create(bot.db, bot.schema, "Data/servers.json") \
+        if config.get("storage") == "database" else None
+    # Heavy math and dice run in worker processes if requested, in threads otherwise
+    bot.evaluator = EvaluationPool(config.get("evaluation_workers", 2)) \
+        if config.get("evaluation") == "processes" else None
+    # Numbers used in math and dice (floats by default)
+    bot.numbers = numeric(config["numbers"], config.get("precision", 28)) \
+        if config.get("numbers", "float") != "float" else None
     twitch_config = data("Secret/" + config.get("twitch"), filenotfound = None)
     await EventSubManager.create(bot, twitch_config)
 
@@ -74,6 +86,8 @@ async def build_bot(path: str):
     await bot.shutdown.wait() # When the shutdown signal is sent
     await bot.db.close()
     await bot.close()
+    if bot.evaluator: bot.evaluator.shutdown()
+    flush() # Write pending data changes to disk
     print(f"{bot.name} has shut down.")
     return bot
 
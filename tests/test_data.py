@@ -0,0 +1,181 @@
+"""
+Tests of the data layer (Modules.data).
+Run from the repository root with: python -m pytest tests
+"""
+
+
+
+##################################################
+# IMPORTS
+##################################################
+
+
+
+from shutil import rmtree
+from subprocess import run, Popen, PIPE
+from sys import executable
+
+import pytest
+
+from Modules import data as data_module
+from Modules.data import _CODECS, data, flush, discard, encode, decode, path_from_root, Lines, \
+    transaction
+
+
+
+##################################################
+# GLOBALS
+##################################################
+
+
+
+_SOURCE = "Data/tests/data.json" # Scratch file, deleted after each test
+_WIDE = {"quantity": 2**70, "debt": -2**80, "items": [2**64 + 1, 18446744073709551615, 5],
+    "low": [-2**63 - 1, -9999999999999999999]}
+# Each alone in a document: the shortest ints that do not fit in 64 bits
+_EDGES = [-2**63 - 1, -9999999999999999999, 2**64, -2**80]
+
+
+
+##################################################
+# CODECS
+##################################################
+
+
+
+@pytest.fixture
+def scratch():
+    """Path of the scratch file, removed (with its directory) afterwards."""
+    path = path_from_root(_SOURCE)
+    yield path
+    discard(path) ; rmtree(path_from_root(_SOURCE.rsplit("/", 1)[0]), ignore_errors = True)
+
+
+@pytest.mark.parametrize("codec", list(_CODECS))
+@pytest.mark.parametrize("compact", [False, True])
+def test_wide_ints_round_trip(monkeypatch, codec, compact):
+    """Ints wider than 64 bits read back as the same ints, with every codec."""
+    monkeypatch.setattr(data_module, "_CODEC", codec)
+    txt = encode(_WIDE, compact)
+    assert decode(txt) == _WIDE
+    assert decode(txt.encode("utf-8")) == _WIDE
+    assert type(decode(txt)["quantity"]) is int
+
+
+@pytest.mark.parametrize("codec", list(_CODECS))
+@pytest.mark.parametrize("value", _EDGES)
+def test_edge_ints_round_trip(monkeypatch, codec, value):
+    """Ints just outside 64 bits read back as the same ints, alone or in a document."""
+    monkeypatch.setattr(data_module, "_CODEC", codec)
+    for document in (value, {"quantity": value}):
+        assert decode(encode(document)) == document
+        assert decode(encode(document).encode("utf-8")) == document
+
+
+def test_wide_ints_in_file(scratch):
+    """Ints wider than 64 bits written to a file are read back exactly."""
+    data(_SOURCE, _WIDE, read_only = False) ; flush()
+    discard(scratch) # Read from disk again
+    assert data(_SOURCE) == _WIDE
+
+
+
+##################################################
+# JOURNALS
+##################################################
+
+
+
+@pytest.fixture
+def journaled(monkeypatch, scratch):
+    """Scratch file, journaled and only flushed by the test."""
+    monkeypatch.setattr(data_module, "_JOURNALS", {_SOURCE: 64 * 1024})
+    monkeypatch.setattr(data_module, "_FLUSH_DELAY", 3600)
+    data(_SOURCE, {"a": 1}, read_only = False) ; flush()
+    discard(scratch)
+    return scratch
+
+
+def test_journal_after_crash(journaled):
+    """Writes appended after a record cut by a crash are replayed."""
+    with open(journaled + ".journal", "a", encoding="utf-8") as F: F.write('[["b"],2,fa')
+    data(_SOURCE, 3, "c", read_only = False) ; flush()
+    with open(journaled + ".journal", encoding="utf-8") as F: journal = F.read()
+    assert "2,fa" not in journal and journal.endswith('[["c"],3,false]\n')
+    discard(journaled) # Restart
+    assert data(_SOURCE) == {"a": 1, "c": 3}
+
+
+def test_journal_skips_bad_lines(journaled):
+    """A record that cannot be read does not stop the replay of the next ones."""
+    with open(journaled + ".journal", "a", encoding="utf-8") as F:
+        F.write('[["b"],2,fa[["c"],3,false]\n[["d"],4,false]\n')
+    assert data(_SOURCE) == {"a": 1, "d": 4}
+
+
+
+##################################################
+# TRANSACTIONS
+##################################################
+
+
+
+def test_transactions_merge_across_processes(monkeypatch, scratch):
+    """Two processes changing different keys under one transaction path both keep their change."""
+    monkeypatch.setattr(data_module, "_FLUSH_DELAY", 3600) # Flushed by the test only
+    data(_SOURCE, {"guild": {"inventory": {"a": 0, "b": 0, "c": 0}}}, read_only = False) ; flush()
+    with transaction(_SOURCE, "guild", "inventory") as inventory:
+        inventory["a"] = 1 ; del inventory["c"]
+    # Another process changes another key of the same object, before this one flushes
+    child = ("from Modules.data import transaction, flush\n"
+        f"with transaction({_SOURCE!r}, 'guild', 'inventory') as inventory: inventory['b'] = 2\n"
+        "flush()")
+    run([executable, "-c", child], cwd = path_from_root(), check = True)
+    flush()
+    discard(scratch) # Read from disk again
+    assert data(_SOURCE, None, "guild", "inventory") == {"a": 1, "b": 2}
+
+
+
+##################################################
+# SHARDS
+##################################################
+
+
+
+def test_migration_once_across_processes(scratch):
+    """Processes migrating the same file at once: one migrates it, the others find it done."""
+    legacy = _SOURCE.rsplit("/", 1)[0] + "/legacy.json"
+    data(legacy, {f"g{i}": {"v": i} for i in range(50)}, read_only = False) ; flush()
+    child = ("from Modules.data import _BACKENDS, Sharded, migrate\n"
+        f"_BACKENDS[{legacy!r}] = Sharded({legacy!r}, {legacy.removesuffix('.json')!r})\n"
+        f"print(migrate({legacy!r}))")
+    children = [Popen([executable, "-c", child], cwd = path_from_root(), stdout = PIPE, stderr = PIPE,
+        text = True) for _ in range(3)]
+    outputs = [child.communicate() for child in children]
+    assert all(child.returncode == 0 for child in children), outputs
+    assert sorted(out.strip() for out, err in outputs) == ["50", "None", "None"]
+    assert data(legacy.removesuffix(".json") + "/g7.json") == {"v": 7}
+
+
+
+##################################################
+# LINES
+##################################################
+
+
+
+def test_lines_not_mapped_when_written(monkeypatch, tmp_path):
+    """The mapping is closed before the file is replaced (Windows refuses to replace mapped files)."""
+    path = str(tmp_path / "lines.txt")
+    lines = Lines(path) ; write_file = data_module.write_file
+    def checked(*args):
+        assert lines.map is None
+        write_file(*args)
+    monkeypatch.setattr(data_module, "write_file", checked)
+    lines.write("a\nbb\nc")
+    assert lines.line(1) == "bb"
+    assert lines.set(1, "xx") == "xx" # In place
+    assert lines.set(1, "longer") == "longer" # Rewritten
+    assert lines.set(4, "e") == "e" # Appended
+    assert lines.text() == "a\nlonger\nc\n\ne"
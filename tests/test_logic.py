@@ -0,0 +1,123 @@
+"""
+Tests of the logic evaluator (Modules.logic).
+Run from the repository root with: python -m pytest tests
+"""
+
+
+
+##################################################
+# IMPORTS
+##################################################
+
+
+
+import tracemalloc
+from time import time
+from fractions import Fraction
+from decimal import Decimal
+
+import pytest
+
+from Modules import logic
+from Modules.logic import fold_expression, main, numeric, _RESULTS
+
+
+
+##################################################
+# FOLDING
+##################################################
+
+
+
+def test_fold_skips_streams(monkeypatch):
+    """Folding sum(range(...)) never builds the range."""
+    built = []
+    def record(*args): built.append(args) ; return []
+    monkeypatch.setattr(logic.Holder, "range_", staticmethod(record))
+    monkeypatch.setitem(logic._LAZY, "range", (record, None))
+    tracemalloc.start()
+    try: tree, steps = fold_expression.__wrapped__("sum(range(1,9999999))")
+    finally:
+        peak = tracemalloc.get_traced_memory()[1] ; tracemalloc.stop()
+    assert not built
+    assert steps[-1] == ("Folded", "sum(range(1,9999999))")
+    assert peak < 1_000_000
+
+
+def test_fold_constants():
+    """Constant subtrees are folded, and give the same result as before folding."""
+    assert fold_expression("2pi*3")[1][-1] == ("Folded", "18.84955592153876")
+    assert fold_expression("sqrt(16)+1")[0].value == 5
+    assert main("sum(range(1,9999999))")[0] == 49999995000000
+
+
+
+##################################################
+# CACHE
+##################################################
+
+
+
+def test_cache_keeps_small_results():
+    """Small deterministic results are kept (and copied when lists), large ones are not."""
+    first = main("range(3)")[0] ; first.append(9)
+    assert main("range(3)")[0] == [1, 2, 3]
+    main("range(1,100000)")
+    assert all(len(result) <= 64 for result, is_list, extracted in _RESULTS.values()
+        if isinstance(result, tuple))
+
+
+def test_cache_miss_uses_deadline():
+    """An expression that is not cached yet is resolved within the time the caller has left."""
+    with pytest.raises(TimeoutError):
+        main("factorial(999)+1", start = time() - 60)
+
+
+
+##################################################
+# STREAMS
+##################################################
+
+
+
+def test_streamed_ranges_are_not_charged_whole():
+    """Ranges read in O(k) or O(1) are charged what is read, even beyond what len() allows."""
+    assert main("keephigh(3,range(1,10^9))")[0] == [10**9, 10**9 - 1, 10**9 - 2]
+    assert main("keeplow(2,range(1,10^30))")[0] == [1, 2]
+    assert main("sum(range(1,10^30))")[0] == 10**30 * (10**30 + 1) // 2
+    assert main("len(range(1,10^30))")[0] == 10**30
+    with pytest.raises(TimeoutError): main("sum(flatten(range(1,10^30)))")
+
+
+
+##################################################
+# VECTORIZED
+##################################################
+
+
+
+@pytest.mark.parametrize("expression", ["iteravg(1180591620717411303424,100)", "iteravg(2^70,100)"])
+def test_vectors_skip_wide_ints(expression):
+    """Integers int64 vectors cannot hold are averaged without numpy."""
+    assert main(expression)[0] == 2**70
+
+
+
+##################################################
+# NUMBERS
+##################################################
+
+
+
+@pytest.mark.parametrize("count", [7, 100]) # Looped, then vectorized (with numpy)
+def test_iteravg_numbers(count):
+    """iteravg() averages as the numeric mode does."""
+    assert type(main(f"iteravg(randint(1,2),{count})", numbers = numeric("fraction"))[0]) in (int, Fraction)
+    assert type(main(f"iteravg(randint(1,2),{count})", numbers = numeric("decimal"))[0]) in (int, Decimal)
+
+
+def test_negative_powers():
+    """Negative exponents are not refused for the size of their inverse (with floats)."""
+    assert main("2^-20000")[0] == 0
+    assert main("2^-3", numbers = numeric("fraction"))[0] == Fraction(1, 8)
+    with pytest.raises(OverflowError): main("2^-20000", numbers = numeric("fraction"))